@@ -0,0 +1,225 @@
+import os
+import time
+
+from dotenv import load_dotenv
+from smolagents import ActionStep, AgentMaxStepsError, CodeAgent, LiteLLMModel, LocalPythonExecutor, PlanningStep, Tool
+
+from agent_pool import AgentPool
+from agent_tools import CachedDuckDuckGoSearchTool, calculator_tool, visit_webpage, read_excel_file, query_table, read_python_file, read_file, file_outline, describe_audio, describe_image, recall_output
+from answer_check import VERIFIER_MODEL, answer_verifier
+from answer_store import config_fingerprint
+from code_workers import CODE_EXECUTOR, ProcessPythonExecutor
+from memory_compaction import MEMORY_TOKEN_BUDGET, MemoryCompactor
+from model_router import FAST_MODEL, MODEL_ROUTING, STRONG_MODEL, route_question, router_stats
+from scheduler import DEFAULT_CONCURRENCY, RateLimitedCompletionClient, fast_limiter
+from tracing import step_callback, tracer
+
+load_dotenv()
+
+
+class TracedPythonExecutor(LocalPythonExecutor):
+    """
+    LocalPythonExecutor recording every tool (and managed agent) call as a span of the question
+    being answered. The generated code runs on smolagents' timeout thread, which does not
+    inherit the trace context, so the caller's span is re-attached around each call.
+    """
+
+    _caller_span = None
+
+    def __call__(self, code_action: str):
+        self._caller_span = tracer.current_span()
+        return super().__call__(code_action)
+
+    def send_tools(self, tools):
+        super().send_tools(tools)
+        for name, tool_obj in tools.items():
+            if name != "final_answer":
+                self.static_tools[name] = self._traced(name, tool_obj)
+
+    def _traced(self, name, tool_obj):
+        kind = "tool" if isinstance(tool_obj, Tool) else "agent"
+
+        def call(*args, **kwargs):
+            with tracer.attach(self._caller_span), tracer.span(name, kind=kind):
+                return tool_obj(*args, **kwargs)
+        return call
+
+    def reset(self):
+        self.state = {"__name__": "__main__"}
+        self.custom_tools = {}
+
+
+class TracedProcessPythonExecutor(TracedPythonExecutor, ProcessPythonExecutor):
+    """TracedPythonExecutor running the code in a worker process, the tools stay in this process."""
+
+    def reset(self):
+        # TracedPythonExecutor.reset comes first in the MRO but only clears the local state
+        ProcessPythonExecutor.reset(self)
+
+
+class TracedCodeAgent(CodeAgent):
+    executor_class = TracedPythonExecutor
+
+    def create_python_executor(self):
+        if self.executor_type != "local":
+            return super().create_python_executor()
+        return self.executor_class(
+            self.additional_authorized_imports,
+            **{"max_print_outputs_length": self.max_print_outputs_length} | self.executor_kwargs,
+        )
+
+
+class SandboxedCodeAgent(TracedCodeAgent):
+    """
+    Runs its code in a worker process with time, CPU and memory limits: runaway code is killed
+    without blocking the run, and the code of concurrent questions runs on separate cores.
+    """
+    executor_class = TracedProcessPythonExecutor
+
+
+# --- Basic Agent Definition ---
+# ----- THIS IS WERE YOU CAN BUILD WHAT YOU WANT ------
+class BasicAgent:
+    # Everything that changes the answers; cached answers are only reused for the same configuration
+    config = {
+        "model_id": STRONG_MODEL,
+        "fast_model_id": FAST_MODEL if MODEL_ROUTING else None,
+        "manager_max_steps": 10,
+        "fast_manager_max_steps": 6,
+        "web_agent_max_steps": 5,
+        "planning_interval": 5,
+        "verifier_model": VERIFIER_MODEL,
+        "memory_token_budget": MEMORY_TOKEN_BUDGET,
+        "version": 5,
+    }
+
+    def __init__(self):
+
+        print("BasicAgent initialized.")
+        self.fingerprint = config_fingerprint(self.config)
+        # Initialize the Hugging Face model
+        self.model = llm_model = LiteLLMModel(
+                model_id=self.config["model_id"], # you can see other model names here: https://cloud.google.com/vertex-ai/generative-ai/docs/learn/models. It is important to prefix the name with "gemini/"
+                api_key=os.getenv("GEMINI_API_KEY"),
+                max_tokens=8192,
+                client=RateLimitedCompletionClient(), # shared RPM/TPM token bucket with adaptive 429 backoff
+                retry=False
+            )
+        # Easy questions are tried with the cheaper, faster model first, see route_question
+        self.models = {
+            "fast": LiteLLMModel(
+                model_id=FAST_MODEL,
+                api_key=os.getenv("GEMINI_API_KEY"),
+                max_tokens=8192,
+                client=RateLimitedCompletionClient(fast_limiter), # own quota, separate from the strong model's
+                retry=False
+            ),
+            "strong": self.model,
+        }
+        self.tier = "strong"
+        self._rejection = None
+        search_tool = CachedDuckDuckGoSearchTool()
+        # Old tool outputs are shortened once the memory is over budget, so prompts don't grow with every step
+        compact_memory = MemoryCompactor()
+
+        self.web_agent = TracedCodeAgent(
+            tools=[search_tool, visit_webpage, recall_output],
+            model=self.model,
+            max_steps=self.config["web_agent_max_steps"],
+            name="web_search_agent",
+            description="Runs web searches for you.",
+            step_callbacks={ActionStep: [step_callback, compact_memory], PlanningStep: step_callback},
+        )
+
+        # Built once and reused for every question, reset() clears the per-run state in between
+        # Its generated code (pandas, requests...) runs in a worker process, unless CODE_EXECUTOR=local
+        manager_class = SandboxedCodeAgent if CODE_EXECUTOR == "process" else TracedCodeAgent
+        self.manager_agent = manager_class(
+            tools=[calculator_tool, read_excel_file, query_table, read_python_file, read_file, file_outline, describe_audio, describe_image, recall_output],
+            managed_agents=[self.web_agent],
+            model=self.model,
+            additional_authorized_imports=["pandas", "re", "requests", "json", "numpy", "bs4", "datetime", "os", "io", "csv"],
+            max_steps=self.config["manager_max_steps"],
+            verbosity_level=2,
+            planning_interval=self.config["planning_interval"],
+            add_base_tools=True,
+            final_answer_checks=[self.check_final_answer],
+            step_callbacks={ActionStep: [step_callback, compact_memory], PlanningStep: step_callback},
+        )
+
+    def reset(self):
+        """Clears memory, monitor and interpreter state of both agents, keeping the built agents."""
+        for agent in (self.manager_agent, self.web_agent):
+            agent.memory.reset()
+            agent.monitor.reset()
+            agent.state.clear()
+            agent.python_executor.reset()
+
+    def check_final_answer(self, final_answer, agent_memory, agent=None):
+        """
+        Formats the answer with the GAIA rules and only asks the LLM when the rules can't settle it.
+        Raising makes the agent retry, with the reason in its memory.
+        """
+        question = getattr(agent, "task", None) or self.manager_agent.task
+        with tracer.span("check_final_answer", kind="verifier"):
+            accepted, _, reason = answer_verifier.verify(question, final_answer, agent_memory)
+        if not accepted:
+            if self.tier == "fast":
+                # No retries with the fast model: the run stops at the next step and is escalated
+                self._rejection = reason
+                self.manager_agent.interrupt()
+            raise ValueError(reason)
+        return True
+
+    def run_tier(self, question: str, tier: str) -> tuple[str | None, str | None]:
+        """Answers with the models of `tier`, returns (answer, failure reason or None)."""
+        # The agents are reused across questions, start from a clean state
+        self.reset()
+        self.tier = tier
+        self._rejection = None
+        self.manager_agent.model = self.web_agent.model = self.models[tier]
+        max_steps = self.config["fast_manager_max_steps"] if tier == "fast" else self.config["manager_max_steps"]
+        try:
+            answer = self.manager_agent.run(question, reset=True, max_steps=max_steps)
+        except Exception as e:
+            if tier != "fast":
+                raise
+            return None, self._rejection or f"{type(e).__name__}: {e}"
+        steps = self.manager_agent.memory.steps
+        if steps and isinstance(getattr(steps[-1], "error", None), AgentMaxStepsError):
+            return answer, "step budget exhausted"
+        return answer, None
+
+    def __call__(self, question: str) -> str:
+        print(f"Agent received question (first 50 chars): {question[:50]}...")
+        tier, route = route_question(question)
+        tracer.annotate(tier=tier, route=route)
+        #fixed_answer = "This is a default answer."
+        #print(f"Agent returning fixed answer: {fixed_answer}")
+        while True:
+            start = time.perf_counter()
+            try:
+                answer, failure = self.run_tier(question, tier)
+            except Exception:
+                router_stats.record(tier, route, time.perf_counter() - start, accepted=False)
+                raise
+            escalate = failure is not None and tier == "fast"
+            router_stats.record(tier, route, time.perf_counter() - start, accepted=failure is None, escalated=escalate)
+            if not escalate:
+                break
+            print(f"Escalating to {STRONG_MODEL} ({failure}): {question[:50]}...")
+            tracer.annotate(tier="strong", escalated=1)
+            tier = "strong"
+        # The verified, formatted version of the answer
+        return answer_verifier.final_answer(question, answer)
+
+
+_agent_pool = None
+
+
+def get_agent_pool() -> AgentPool:
+    """Process-wide pool of pre-built agents, shared by every evaluation run."""
+    global _agent_pool
+    if _agent_pool is None:
+        _agent_pool = AgentPool(BasicAgent, size=DEFAULT_CONCURRENCY)
+    return _agent_pool
@@ -0,0 +1,63 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class AgentPool:
+    """
+    Fixed-size pool of pre-built agents for concurrent runs.
+
+    Building an agent (model client, tools, managed agents, prompt templates) is done once per
+    pool slot; a worker checks an agent out for the duration of one question and the agent's
+    `reset()` is called before it goes back to the pool, so no run sees another run's memory.
+    """
+
+    def __init__(self, factory, size: int = 1, prewarm: bool = True):
+        self.factory = factory
+        self.size = max(1, size)
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+        if prewarm:
+            self.prewarm()
+
+    def prewarm(self):
+        """Builds every missing agent up front (in parallel) so the first questions don't pay for it."""
+        with self._lock:
+            missing = self.size - self._created
+            self._created = self.size
+        if missing <= 0:
+            return
+        with ThreadPoolExecutor(max_workers=missing) as executor:
+            for agent in executor.map(lambda _: self.factory(), range(missing)):
+                self._idle.put(agent)
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    @contextmanager
+    def acquire(self):
+        agent = self._checkout()
+        try:
+            yield agent
+        finally:
+            try:
+                agent.reset()
+            finally:
+                self._idle.put(agent)
@@ -1,57 +1,78 @@
-from smolagents import tool
-import numpy as np
-import time
-import datetime
+from smolagents import tool, DuckDuckGoSearchTool
+import os
 import re
-from markdownify import markdownify
-import requests
 from requests.exceptions import RequestException
-import litellm
 from dotenv import load_dotenv
-from pathlib import Path
+from http_cache import web_cache, content_hash
+from http_client import http_client
+from html_extract import extract_blocks, relevant_excerpt
+from table_cache import describe_schema, table_cache
+from media import AUDIO_PROMPT, IMAGE_PROMPT, media_analyzer
+from audio_transcribe import transcribe_audio
+from tracing import tracer
+from safe_eval import CalculatorError, evaluate, format_result
+from memory_compaction import output_store
+from file_reader import DEFAULT_WINDOW_LINES, file_reader
 
 load_dotenv()
 
+WEBPAGE_TOKEN_BUDGET = int(os.getenv("WEBPAGE_TOKEN_BUDGET", "2000"))
+MAX_TABLE_ROWS_IN_PROMPT = int(os.getenv("MAX_TABLE_ROWS_IN_PROMPT", "200"))
+
 @tool
 def calculator_tool(expression: str) -> str:
     """
-    A simple calculator that performs basic arithmetic operations.
+    A calculator for arithmetic expressions, evaluated exactly when possible (0.1 + 0.2 gives 0.3, 1/4 gives 0.25).
+    Supports + - * / // % and ** (or ^), constants pi and e, functions such as sqrt, log(x, base), ln, sin, cos,
+    factorial, comb, round, and lists: sum([1, 2, 3]), mean(...), median(...), max(...), [1, 2, 3] * 2, sum(range(1, 101)).
 
     Args:
-        expression: The mathematical expression to evaluate (e.g., '2 + 3 * 4'). 
+        expression: The mathematical expression to evaluate (e.g., '2 + 3 * 4', 'sqrt(2)^2', 'mean([3, 5, 10])').
     """
-    # Remove any non-digit or non-operator characters from the expression
-    expression = re.sub(r'[^0-9+\-*/().]', '', expression)
-    
     try:
-        # Evaluate the expression using the built-in eval() function
-        result = eval(expression)
-        return str(result)
-    except (SyntaxError, ZeroDivisionError, NameError, TypeError, OverflowError):
-        return "Error: Invalid expression"
-    
+        # Parsed and evaluated on a whitelisted AST with limits on number size and time (no eval)
+        return format_result(evaluate(expression))
+    except CalculatorError as e:
+        return f"Error: {e}"
+
 @tool
-def visit_webpage(url: str) -> str:
+def visit_webpage(url: str, query: str | None = None) -> str:
     """Visits a webpage at the given URL and returns its content as a markdown string.
+    When a query is given, only the passages of the page most relevant to it are returned,
+    which is much shorter for large pages.
 
     Args:
         url: The URL of the webpage to visit.
+        query: Optional. What you are looking for on the page, e.g. 'year the album was released'.
 
     Returns:
         The content of the webpage converted to Markdown, or an error message if the request fails.
     """
     try:
-        # Send a GET request to the URL
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for bad status codes
+        if query:
+            # Streaming extraction: boilerplate is dropped while the body is parsed chunk by chunk,
+            # and only the text blocks are cached so other queries on the same page are cheap
+            blocks = web_cache.get_or_compute("blocks", url, lambda: extract_blocks(http_client.iter_text(url)))
+            excerpt = relevant_excerpt(blocks, query, token_budget=WEBPAGE_TOKEN_BUDGET)
+            return excerpt or "No content relevant to the query was found on this page."
+
+        # Send a GET request to the URL (served from the shared cache when possible).
+        # The body is streamed and cut at the size cap so huge pages never reach markdownify whole
+        html = web_cache.fetch_text(url, lambda url, headers: http_client.get_bounded(url, headers=headers, truncate=True))
 
-        # Convert the HTML content to Markdown
-        markdown_content = markdownify(response.text).strip()
+        def convert():
+            # Imported on first use, most pages are read through the query path
+            from markdownify import markdownify
 
-        # Remove multiple line breaks
-        markdown_content = re.sub(r"\n{3,}", "\n\n", markdown_content)
+            # Convert the HTML content to Markdown
+            with tracer.span("markdownify", html_bytes=len(html)):
+                markdown_content = markdownify(html).strip()
 
-        return markdown_content
+            # Remove multiple line breaks
+            return re.sub(r"\n{3,}", "\n\n", markdown_content)
+
+        # The conversion is keyed by the page content, so identical pages are converted once
+        return web_cache.get_or_compute("markdown", content_hash(html), convert)
 
     except RequestException as e:
         return f"Error fetching the webpage: {str(e)}"
@@ -59,83 +80,156 @@ def visit_webpage(url: str) -> str:
         return f"An unexpected error occurred: {str(e)}"
     
 
+class CachedDuckDuckGoSearchTool(DuckDuckGoSearchTool):
+    """DuckDuckGo search whose results are shared through the web cache for a few hours."""
+
+    def forward(self, query: str) -> str:
+        return web_cache.get_or_compute("search", f"{self.max_results}:{query}", lambda: super(CachedDuckDuckGoSearchTool, self).forward(query), ttl=6 * 3600)
+
+
 @tool
-def read_excel_file(file_path: str) -> str:
-    """Reads an Excel file and returns its content as a string.
+def read_excel_file(file_path: str, sheet_name: str | None = None) -> str:
+    """Reads an Excel (or csv) file and returns its content as a string.
+    Large sheets are summarized (columns, types, first rows): use query_table to filter or aggregate them.
 
     Args:
         file_path: The path to the Excel file.
+        sheet_name: Optional. The sheet to read, by default every sheet is returned.
 
     Returns:
         The content of the Excel file as a string, or an error message if the file cannot be read.
     """
     try:
-        import pandas as pd
-        # Read the Excel file
-        df = pd.read_excel(file_path)
-
-        # Convert the DataFrame to a string representation
-        return df.to_string()
+        # Parsed once per file content, then served from the columnar cache
+        sheets = table_cache.load(file_path)
+        if sheet_name:
+            sheets = {sheet_name: table_cache.sheet(file_path, sheet_name)}
+
+        # Convert the DataFrames to a string representation
+        parts = []
+        for name, df in sheets.items():
+            if len(df) <= MAX_TABLE_ROWS_IN_PROMPT:
+                parts.append(f"Sheet '{name}':\n{df.to_string()}")
+            else:
+                parts.append(
+                    f"{describe_schema(df, name)}\nFirst rows:\n{df.head(10).to_string()}\n"
+                    f"(sheet truncated, use query_table to filter or aggregate its {len(df)} rows)"
+                )
+        return "\n\n".join(parts)
 
     except Exception as e:
         return f"Error reading the Excel file: {str(e)}"
-    
+
+
 @tool
-def read_python_file(file_path: str) -> str:
-    """Reads a Python file and returns its content as a string.
+def query_table(file_path: str, operation: str, sheet_name: str | None = None, columns: str | None = None,
+                filter: str | None = None, group_by: str | None = None, aggregation: str | None = None,
+                n: int | None = None) -> str:
+    """Runs a narrow query on an Excel or csv file instead of reading it whole.
 
     Args:
-        file_path: The path to the Python file.
+        file_path: The path to the Excel or csv file.
+        operation: One of 'schema' (columns and types), 'head' (first n rows), 'sample' (n random rows), 'filter' (rows matching the filter) or 'aggregate' (aggregation of columns, optionally grouped).
+        sheet_name: Optional. The sheet to query, the first sheet by default.
+        columns: Optional. Comma separated list of the columns to keep or aggregate, e.g. 'Sales,Region'.
+        filter: Optional. A pandas query expression applied before the operation, e.g. "Category == 'Food' and Price > 3".
+        group_by: Optional. Comma separated list of the columns to group by for 'aggregate'.
+        aggregation: Optional. Aggregation for 'aggregate': sum, mean, count, min, max, median, std or nunique. Defaults to sum.
+        n: Optional. Number of rows returned by 'head', 'sample' and 'filter'. Defaults to 20.
 
     Returns:
-        The content of the Python file as a string, or an error message if the file cannot be read.
+        The query result as a string, or an error message.
     """
     try:
-        with open(file_path, 'r') as file:
-            content = file.read()
-        return content
+        df = table_cache.sheet(file_path, sheet_name)
+        name = sheet_name or next(iter(table_cache.load(file_path)))
+        n = n or 20
+        if operation == "schema":
+            return describe_schema(df, name)
+        if filter:
+            df = df.query(filter)
+        selected_columns = [column.strip() for column in columns.split(",")] if columns else None
+        if operation == "aggregate":
+            aggregation = aggregation or "sum"
+            if group_by:
+                keys = [column.strip() for column in group_by.split(",")]
+                grouped = df.groupby(keys)
+                result = grouped[selected_columns].agg(aggregation) if selected_columns else grouped.agg(aggregation, numeric_only=True)
+            else:
+                data = df[selected_columns] if selected_columns else df.select_dtypes("number")
+                result = data.agg(aggregation)
+            return result.to_string()
+        if selected_columns:
+            df = df[selected_columns]
+        if operation == "head":
+            return df.head(n).to_string()
+        if operation == "sample":
+            return df.sample(min(n, len(df)), random_state=0).to_string()
+        if operation == "filter":
+            return f"{len(df)} matching rows\n{df.head(n).to_string()}"
+        return f"Error: unknown operation '{operation}', use schema, head, sample, filter or aggregate."
+
     except Exception as e:
-        return f"Error reading the Python file: {str(e)}"
-    
+        return f"Error querying the table: {str(e)}"
 
 @tool
-def read_python_file(file_path: str) -> str:
-    """Reads a Python file and returns its content as a string.
+def read_python_file(file_path: str, start_line: int | None = None, num_lines: int | None = None) -> str:
+    """Reads a Python file. Small files are returned whole; for large ones the outline (classes and
+    functions with their line numbers) and the first lines are returned: read the rest by line ranges.
 
     Args:
         file_path: The path to the Python file.
+        start_line: Optional. First line to read (1-based).
+        num_lines: Optional. Number of lines to read from start_line, 200 by default.
 
     Returns:
-        The content of the Python file as a string, or an error message if the file cannot be read.
+        The numbered lines of the Python file, or an error message if the file cannot be read.
     """
     try:
-        with open(file_path, 'r') as file:
-            content = file.read()
-        return content
+        if start_line is None and num_lines is None and file_reader.line_count(file_path) > DEFAULT_WINDOW_LINES:
+            return f"{file_reader.outline(file_path)}\n\n{file_reader.read_lines(file_path)}"
+        return file_reader.read_lines(file_path, start_line, num_lines)
     except Exception as e:
         return f"Error reading the Python file: {str(e)}"
 
-import base64
 
-def convert_image_to_base64(image_path: str) -> str:
-    """
-    Converts an image to a Base64 string.
+@tool
+def read_file(file_path: str, start_line: int | None = None, num_lines: int | None = None, offset: int | None = None) -> str:
+    """Reads a window of a text attachment (txt, csv, json, md, py, pdf...) without loading it whole.
+    Returns numbered lines and how to continue. Use file_outline first to find where to look in large files.
 
     Args:
-        image_path: The path to the image file.
+        file_path: The path to the file.
+        start_line: Optional. First line to read (1-based), 1 by default.
+        num_lines: Optional. Number of lines to read, 200 by default. The window is also capped at 8000 characters.
+        offset: Optional. Read from this byte offset instead of by lines, for files with very long lines (e.g. minified JSON).
 
     Returns:
-        A Base64 encoded string of the image.
+        The requested part of the file, or an error message if the file cannot be read.
     """
     try:
-        with open(image_path, "rb") as image_file:
-            # Read the image file as binary data
-            encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
-        return encoded_string
+        if offset is not None:
+            return file_reader.read_bytes(file_path, offset)
+        return file_reader.read_lines(file_path, start_line, num_lines)
     except Exception as e:
-        return f"Error converting image to Base64: {str(e)}"
+        return f"Error reading the file: {str(e)}"
 
 
+@tool
+def file_outline(file_path: str) -> str:
+    """Returns the structure of a file without its whole content: classes and functions with line numbers
+    for Python, columns with types and sample rows for csv, schema and first items for json, headings for text and pages for pdf.
+
+    Args:
+        file_path: The path to the file.
+
+    Returns:
+        The outline of the file, or an error message if the file cannot be read.
+    """
+    try:
+        return file_reader.outline(file_path)
+    except Exception as e:
+        return f"Error reading the file: {str(e)}"
 
 @tool
 def describe_image(image_path: str) -> str:
@@ -146,41 +240,8 @@ def describe_image(image_path: str) -> str:
         image_path: the input path of the image to describe.
     """
 
-    encoded_data = convert_image_to_base64(image_path)
-
-    messages = [
-    {
-        "role": "user",
-        "content": [
-            {
-                "type": "text",
-                "text": "Describe the image in detail."
-            },
-            
-            # {
-            #      "type": "image_url",
-            #      "image_url": {"url": image_path}
-            #  }
-            {
-                    "type": "file",
-                    "file": {
-                        "file_data": f"data:image/png;base64,{encoded_data}",  # 👈 SET MIME_TYPE + DATA
-                    }
-                },
-        ]
-    }
-]
-
-    # Make the API call to Gemini model
-    response = litellm.completion(
-        model="gemini/gemini-2.0-flash-lite",
-        messages=messages,
-    )
-
-    # Extract the response content
-    content = response.get('choices', [{}])[0].get('message', {}).get('content')
-
-    return content
+    # Cached by file content: the same image is only sent to the model once
+    return media_analyzer.analyze(image_path, IMAGE_PROMPT)
 
 @tool
 def describe_audio(audio_path: str) -> str:
@@ -191,36 +252,31 @@ def describe_audio(audio_path: str) -> str:
         audio_path: the input path of the audio to transcribe.
     """
 
-    audio_bytes = Path(audio_path).read_bytes()
-    encoded_data = base64.b64encode(audio_bytes).decode("utf-8")
-
-    messages=[
-        {
-            "role": "user",
-            "content": [
-                {"type": "text", "text": "Please transcribe the content of this audio."},
-                {
-                    "type": "file",
-                    "file": {
-                        "file_data": "data:audio/mp3;base64,{}".format(encoded_data), # 👈 SET MIME_TYPE + DATA
-                    }
-                },
-            ],
-        }
-    ]
-
-    # Make the API call to Gemini model
-    response = litellm.completion(
-        model="gemini/gemini-2.0-flash-lite",
-        messages=messages,
-    )
-
-    # Extract the response content
-    content = response.get('choices', [{}])[0].get('message', {}).get('content')
-
-    return content
+    # Long recordings are split on silences and transcribed in parallel, every chunk is cached
+    return transcribe_audio(audio_path, AUDIO_PROMPT)
     
 
+@tool
+def recall_output(ref: str, start: int | None = None, length: int | None = None) -> str:
+    """
+    Returns the full text of an earlier tool output that was shortened in memory to save context.
+
+    Args:
+        ref: The reference given in the shortened output, e.g. 'out-3f2a9c1b7d'.
+        start: Optional. Character offset to start reading from, 0 by default.
+        length: Optional. Number of characters to return, 8000 by default.
+    """
+    text = output_store.get(ref)
+    if text is None:
+        return f"Error: no stored output with reference '{ref}'."
+    start = start or 0
+    length = length or 8000
+    excerpt = text[start:start + length]
+    if start + length < len(text):
+        excerpt += f"\n[... {len(text) - start - length} more characters, call recall_output(ref=\"{ref}\", start={start + length}) to continue ...]"
+    return excerpt
+
+
 if __name__ == "__main__":
     # example usage of image description
     image_path = "./cca530fc-4052-43b2-b130-b30968d8aa44.png"
@@ -0,0 +1,184 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from answer_store import question_hash
+from scheduler import estimate_tokens, rate_limited_completion
+from tracing import tracer
+
+VERIFIER_MODEL = os.getenv("VERIFIER_MODEL", "gemini/gemini-2.0-flash")
+VERIFIER_CONTEXT_TOKENS = int(os.getenv("VERIFIER_CONTEXT_TOKENS", "1500"))
+# Longer answers are not "as few words as possible" and are sent to the LLM to be shortened
+MAX_ANSWER_WORDS = 12
+
+FORMAT_RULES = """YOUR FINAL ANSWER should be a number OR as few words as possible OR a comma separated list of numbers and/or strings.
+If you are asked for a number, don't use comma to write your number neither use units such as $ or percent sign unless specified otherwise.
+If you are asked for a string, don't use articles, neither abbreviations (e.g. for cities), and write the digits in plain text unless specified otherwise.
+If you are asked for a comma separated list, apply the above rules depending of whether the element to be put in the list is a number or a string."""
+
+NUMBER_PATTERN = re.compile(r"^[-+]?[$€£]?\s*[-+]?(\d{1,3}(,\d{3})+|\d+)?(\.\d+)?\s*%?$")
+ARTICLE_PATTERN = re.compile(r"^(the|a|an)\s+(?=\S)", re.IGNORECASE)
+LIST_QUESTION_PATTERN = re.compile(r"\b(list|comma[- ]separated|separated by commas?)\b", re.IGNORECASE)
+NUMERIC_QUESTION_PATTERN = re.compile(r"\b(how many|how much|what number|what is the (total|sum|number|count))\b", re.IGNORECASE)
+NON_ANSWER_PATTERN = re.compile(
+    r"(agent error|\berror\b|i (cannot|can't|could not|couldn't|was unable|am unable)|unable to|not (able|possible) to"
+    r"|i don't know|\bunknown\b|no (answer|information)|not found|n/a)",
+    re.IGNORECASE,
+)
+
+
+def _is_number(text: str) -> bool:
+    return bool(re.search(r"\d", text)) and bool(NUMBER_PATTERN.match(text))
+
+
+def _normalize_item(text: str) -> str:
+    text = text.strip().strip("\"'`").strip()
+    if _is_number(text):
+        # Currency, percent signs and thousands separators are dropped from numbers
+        return re.sub(r"[$€£%,\s]", "", text)
+    # Articles are left to the verifier: "The Beatles" is a name, not "Beatles"
+    return text.rstrip(".").strip()
+
+
+def normalize_answer(answer, question: str = "") -> str:
+    """
+    Applies the GAIA formatting rules that don't need any judgement: numbers and lists.
+    A comma is a thousands separator only when the whole answer is one number and the question
+    doesn't ask for a list: "100,200,300" stays a list of three numbers for a list question.
+    """
+    text = "" if answer is None else str(answer).strip()
+    text = re.sub(r"^\s*final answer\s*:\s*", "", text, flags=re.IGNORECASE).strip()
+    is_list = "," in text or ";" in text
+    if is_list and _is_number(text) and not LIST_QUESTION_PATTERN.search(question or ""):
+        is_list = False
+    if "\n" not in text and is_list:
+        return ", ".join(item for item in (_normalize_item(part) for part in re.split(r"[,;]", text)) if item)
+    return _normalize_item(text)
+
+
+def rule_verdict(question: str, answer: str) -> tuple[bool, str] | None:
+    """
+    Settles the common cases without an LLM: returns (accepted, reason), or None when the
+    answer needs a judgement (refusals, long sentences, non numbers for a numeric question).
+    """
+    if not answer:
+        return False, "The final answer is empty, call final_answer with the answer itself."
+    if NON_ANSWER_PATTERN.search(answer) or "\n" in answer:
+        return None
+    if _is_number(answer):
+        return True, "number"
+    if NUMERIC_QUESTION_PATTERN.search(question):
+        # Only a bare number settles a numeric question: "5 apples" or "12 km" need the unit removed
+        return None
+    items = [item.strip() for item in answer.split(",")]
+    if any(ARTICLE_PATTERN.match(item) for item in items):
+        # Leading articles should be dropped, unless they are part of a name: that needs a judgement
+        return None
+    if all(len(item.split()) <= MAX_ANSWER_WORDS for item in items):
+        return True, "list" if len(items) > 1 else "short string"
+    return None
+
+
+def trimmed_context(memory, token_budget: int = VERIFIER_CONTEXT_TOKENS) -> str:
+    """The last code actions and observations of the run, newest first, within `token_budget`."""
+    parts = []
+    used = 0
+    for step in reversed(getattr(memory, "steps", []) or []):
+        code_action = getattr(step, "code_action", None)
+        observations = getattr(step, "observations", None)
+        error = getattr(step, "error", None)
+        if not (code_action or observations or error):
+            continue
+        text = f"Step {getattr(step, 'step_number', '?')}:"
+        if code_action:
+            text += f"\nCode: {code_action[:400]}"
+        if observations:
+            text += f"\nObservation: {observations[:800]}"
+        if error:
+            text += f"\nError: {str(error)[:200]}"
+        used += estimate_tokens(text)
+        if parts and used > token_budget:
+            break
+        parts.append(text)
+    return "\n\n".join(reversed(parts))
+
+
+class AnswerVerifier:
+    """
+    Final answer check of the manager agent. The GAIA formatting rules are applied in code and
+    settle most answers; the LLM is only asked, with the last steps of the run instead of the
+    whole memory, when the rules can't. Verdicts are memoized per (question, answer).
+    """
+
+    def __init__(self, model: str = VERIFIER_MODEL, max_entries: int = 1024):
+        self.model = model
+        self.max_entries = max_entries
+        self._verdicts = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"rules": 0, "llm": 0, "cached": 0}
+
+    def _ask_llm(self, question: str, answer: str, context: str) -> tuple[bool, str, str]:
+        prompt = f"""You check the final answer of an agent before it is submitted.
+Task: {question}
+
+Last steps of the agent:
+{context or "(none)"}
+
+Proposed answer: {answer}
+
+If the steps support the proposed answer, rewrite it following these rules:
+{FORMAT_RULES}
+Then finish with: FINAL ANSWER: [THE REWRITTEN ANSWER]
+If the proposed answer is not an answer (a refusal, an error) or contradicts the steps, finish with: REJECT: [what is wrong]"""
+        response = rate_limited_completion(model=self.model, messages=[{"role": "user", "content": [{"type": "text", "text": prompt}]}])
+        content = response.get('choices', [{}])[0].get('message', {}).get('content') or ""
+        rejection = re.search(r"REJECT:\s*(.+)", content, re.DOTALL)
+        final_answer = re.search(r"FINAL ANSWER:\s*(.+)", content, re.DOTALL)
+        if final_answer and not rejection:
+            return True, normalize_answer(final_answer.group(1).strip().splitlines()[0], question), "llm"
+        reason = rejection.group(1).strip() if rejection else "the answer could not be verified"
+        return False, answer, f"The final answer was rejected: {reason}"
+
+    def verify(self, question: str, answer, memory=None) -> tuple[bool, str, str]:
+        """Returns (accepted, answer to submit, reason)."""
+        normalized = normalize_answer(answer, question)
+        key = (question_hash(question), normalized)
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                self._verdicts.move_to_end(key)
+                self._stats["cached"] += 1
+                tracer.annotate(verifier="cached")
+                return verdict
+
+        settled = rule_verdict(question, normalized)
+        if settled is not None:
+            accepted, reason = settled
+            verdict = (accepted, normalized, reason)
+            source = "rules"
+        else:
+            verdict = self._ask_llm(question, normalized, trimmed_context(memory))
+            source = "llm"
+        tracer.annotate(verifier=source)
+        with self._lock:
+            self._stats[source] += 1
+            self._verdicts[key] = verdict
+            while len(self._verdicts) > self.max_entries:
+                self._verdicts.popitem(last=False)
+        return verdict
+
+    def final_answer(self, question: str, answer) -> str:
+        """The answer to submit: the verified rewrite when there is one, the normalized answer otherwise."""
+        normalized = normalize_answer(answer, question)
+        with self._lock:
+            verdict = self._verdicts.get((question_hash(question), normalized))
+        return verdict[1] if verdict is not None and verdict[0] else normalized
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+# Shared by every agent of the pool, so a verdict is never computed twice
+answer_verifier = AnswerVerifier()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+DEFAULT_ANSWER_STORE_PATH = os.getenv("ANSWER_STORE_PATH", "answers_cache.jsonl")
+
+
+def question_hash(question: str, file_name: str | None = None) -> str:
+    """Hash of the question as served by the scoring API (text + attachment name)."""
+    return hashlib.sha256(f"{question}\x00{file_name or ''}".encode("utf-8")).hexdigest()[:16]
+
+
+def config_fingerprint(config: dict) -> str:
+    """Stable short hash of an agent configuration dictionary."""
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class AnswerStore:
+    """
+    Append-only JSONL store of agent answers keyed by (task_id, question hash, config fingerprint).
+
+    Every answer is appended and fsynced as soon as it is produced, so a crashed run can be
+    resumed and only the missing tasks are recomputed. When the same key appears several
+    times the last record wins.
+    """
+
+    def __init__(self, path: str = DEFAULT_ANSWER_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = {}
+        self._load()
+
+    @staticmethod
+    def make_key(task_id: str, question: str, fingerprint: str, file_name: str | None = None) -> str:
+        return f"{task_id}:{question_hash(question, file_name)}:{fingerprint}"
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A crash mid-write can leave a torn last line: cut it off, or the next put
+                    # would be appended to it and lost too. The rest of the file is still valid
+                    f.truncate(offset)
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._records[record["key"]] = record
+
+    def get(self, task_id: str, question: str, fingerprint: str, file_name: str | None = None) -> dict | None:
+        with self._lock:
+            return self._records.get(self.make_key(task_id, question, fingerprint, file_name))
+
+    def put(self, task_id: str, question: str, fingerprint: str, answer, file_name: str | None = None) -> dict:
+        record = {
+            "key": self.make_key(task_id, question, fingerprint, file_name),
+            "task_id": task_id,
+            "question": question,
+            "file_name": file_name,
+            "fingerprint": fingerprint,
+            "submitted_answer": answer,
+            "created_at": time.time(),
+        }
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._records[record["key"]] = record
+        return record
+
+    def latest_answers(self, fingerprint: str | None = None) -> list[dict]:
+        """Most recent record per task_id, optionally restricted to one agent configuration."""
+        latest = {}
+        with self._lock:
+            for record in self._records.values():
+                if fingerprint is not None and record["fingerprint"] != fingerprint:
+                    continue
+                current = latest.get(record["task_id"])
+                if current is None or record["created_at"] >= current["created_at"]:
+                    latest[record["task_id"]] = record
+        return sorted(latest.values(), key=lambda record: record["created_at"])
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
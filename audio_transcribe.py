@@ -0,0 +1,194 @@
+import io
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from http_cache import file_digest
+from media import AUDIO_PROMPT, guess_mime_type, media_analyzer
+
+# Recordings up to this size are sent as they are, in a single request
+SMALL_AUDIO_BYTES = int(os.getenv("SMALL_AUDIO_BYTES", str(2 * 1024 * 1024)))
+MAX_CHUNK_MS = int(os.getenv("AUDIO_MAX_CHUNK_MS", str(60 * 1000)))
+OVERLAP_MS = 1500
+MIN_SILENCE_MS = 400
+# Silence kept before and after the speech of a chunk
+SILENCE_PADDING_MS = 300
+SPEECH_FRAME_RATE = 16000
+SPEECH_BITRATE = "32k"
+# Requests per chunk before it is marked as not transcribed
+CHUNK_ATTEMPTS = 2
+
+
+def segment_on_silence(audio, max_chunk_ms: int = MAX_CHUNK_MS, min_silence_ms: int = MIN_SILENCE_MS,
+                       overlap_ms: int = OVERLAP_MS, padding_ms: int = SILENCE_PADDING_MS) -> list[tuple[int, int]]:
+    """
+    Splits a pydub AudioSegment into (start_ms, end_ms) chunks of at most `max_chunk_ms`.
+    Cuts are placed in silences whenever possible, keeping `padding_ms` of silence around the
+    speech and skipping the rest; speech longer than a chunk is cut hard with `overlap_ms` of
+    overlap so no word is lost at the boundary.
+    """
+    from pydub.silence import detect_nonsilent
+
+    silence_threshold = audio.dBFS - 16 if audio.dBFS != float("-inf") else -50
+    speech = detect_nonsilent(audio, min_silence_len=min_silence_ms, silence_thresh=silence_threshold, seek_step=10)
+    if not speech:
+        return [(0, len(audio))] if len(audio) else []
+
+    # Room left for the speech once the padding is added on both sides
+    limit = max_chunk_ms - 2 * padding_ms
+    # Hard-split the speech ranges that don't fit in one chunk
+    ranges = []
+    for start, end in speech:
+        while end - start > limit:
+            ranges.append((start, start + limit))
+            start += limit - overlap_ms
+        ranges.append((start, end))
+
+    # Pack consecutive speech ranges into chunks, the silences between chunks are not uploaded
+    chunks = []
+    chunk_start, chunk_end = ranges[0]
+    for start, end in ranges[1:]:
+        if end - chunk_start <= limit:
+            chunk_end = end
+            continue
+        chunks.append((max(0, chunk_start - padding_ms), min(len(audio), chunk_end + padding_ms)))
+        chunk_start, chunk_end = start, end
+    chunks.append((max(0, chunk_start - padding_ms), min(len(audio), chunk_end + padding_ms)))
+    return chunks
+
+
+def encode_for_speech(segment) -> tuple[bytes, str]:
+    """Downsamples to 16 kHz mono; mp3 at 32 kbps when ffmpeg is available, 16-bit wav otherwise."""
+    segment = segment.set_channels(1).set_frame_rate(SPEECH_FRAME_RATE).set_sample_width(2)
+    buffer = io.BytesIO()
+    if shutil.which("ffmpeg"):
+        segment.export(buffer, format="mp3", bitrate=SPEECH_BITRATE)
+        return buffer.getvalue(), "audio/mpeg"
+    segment.export(buffer, format="wav")
+    return buffer.getvalue(), "audio/wav"
+
+
+def _normalize_words(text: str) -> list[str]:
+    return [re.sub(r"[^\w']", "", word.lower()) for word in text.split()]
+
+
+def stitch_transcripts(parts: list[str], max_overlap_words: int = 30) -> str:
+    """
+    Joins chunk transcripts in order, removing the words repeated at the start of a chunk
+    because of the overlap with the end of the previous one.
+    """
+    stitched = []
+    for part in parts:
+        words = (part or "").split()
+        if stitched and words:
+            previous = _normalize_words(" ".join(stitched[-max_overlap_words:]))
+            current = _normalize_words(" ".join(words[:max_overlap_words]))
+            overlap = 0
+            for size in range(min(len(previous), len(current)), 1, -1):
+                if previous[-size:] == current[:size]:
+                    overlap = size
+                    break
+            words = words[overlap:]
+        stitched.extend(words)
+    return " ".join(stitched)
+
+
+class PartialTranscript(Exception):
+    """Some chunks could not be transcribed: the transcript is returned but not cached."""
+
+    def __init__(self, transcript: str):
+        super().__init__(transcript)
+        self.transcript = transcript
+
+
+def _timestamp(ms: int) -> str:
+    seconds = ms // 1000
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def _transcribe_chunk(data: bytes, mime_type: str, prompt: str) -> str:
+    for attempt in range(1, CHUNK_ATTEMPTS + 1):
+        try:
+            return media_analyzer.analyze_bytes(data, mime_type, prompt)
+        except Exception:
+            if attempt == CHUNK_ATTEMPTS:
+                raise
+
+
+def _transcribe_chunks(audio_path: str, chunks: list[tuple[int, int]], encoded_chunks: list[tuple[bytes, str]],
+                       prompt: str, max_workers: int) -> str:
+    """
+    Transcribes the chunks in parallel and stitches them in order. A chunk that still fails after
+    CHUNK_ATTEMPTS is marked in the transcript and the others are kept; PartialTranscript is raised
+    so the incomplete transcript isn't cached (the chunks that succeeded are).
+    """
+    def transcribe(chunk):
+        try:
+            return _transcribe_chunk(chunk[0], chunk[1], prompt), None
+        except Exception as e:
+            return None, e
+
+    # Every chunk is cached by its content, so asking again about the same file is free
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(encoded_chunks)))) as executor:
+        results = list(executor.map(transcribe, encoded_chunks))
+    errors = [error for _, error in results if error is not None]
+    if len(errors) == len(results):
+        raise errors[-1]
+    parts = []
+    for index, ((start, end), (text, error)) in enumerate(zip(chunks, results), 1):
+        if error is not None:
+            print(f"Could not transcribe chunk {index} of {audio_path}: {error}")
+            text = f"[{_timestamp(start)}-{_timestamp(end)} could not be transcribed]"
+        parts.append(text)
+    transcript = stitch_transcripts(parts)
+    if errors:
+        raise PartialTranscript(transcript)
+    return transcript
+
+
+def _segment(audio_path: str) -> tuple[list[tuple[int, int]], list[tuple[bytes, str]]]:
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(audio_path)
+    chunks = segment_on_silence(audio)
+    encoded_chunks = [encode_for_speech(audio[start:end]) for start, end in chunks]
+    print(f"Transcribing {audio_path} in {len(encoded_chunks)} chunks "
+          f"({os.path.getsize(audio_path)} bytes -> {sum(len(data) for data, _ in encoded_chunks)} bytes uploaded)")
+    return chunks, encoded_chunks
+
+
+def transcribe_audio(audio_path: str, prompt: str = AUDIO_PROMPT, max_workers: int = 4) -> str:
+    """
+    Transcribes a recording. Short files are sent as they are; long ones are segmented on
+    silences, downsampled to speech quality, transcribed in parallel and stitched back in order.
+    Falls back to a single request when pydub (or the decoder it needs) is not available.
+    """
+    if os.path.getsize(audio_path) <= SMALL_AUDIO_BYTES:
+        return media_analyzer.analyze(audio_path, prompt)
+    try:
+        import pydub  # noqa: F401
+    except ImportError:
+        return media_analyzer.analyze(audio_path, prompt)
+
+    def transcribe():
+        try:
+            chunks, encoded_chunks = _segment(audio_path)
+        except Exception as e:
+            # Mostly a missing ffmpeg to decode compressed formats
+            print(f"Could not segment {audio_path} ({e}), sending it whole")
+            return media_analyzer.analyze(audio_path, prompt, guess_mime_type(audio_path))
+        return _transcribe_chunks(audio_path, chunks, encoded_chunks, prompt, max_workers)
+
+    key = f"{media_analyzer.backend.name}:{file_digest(audio_path)}:{MAX_CHUNK_MS}:{prompt}"
+    try:
+        return media_analyzer.cache.get_or_compute("transcript", key, transcribe)
+    except PartialTranscript as e:
+        return e.transcript
+
+
+def describe_attachment(path: str) -> str:
+    """What the describe_* tools return for a media file: a transcript for audio, a description otherwise."""
+    if guess_mime_type(path).startswith("audio/"):
+        return transcribe_audio(path)
+    return media_analyzer.analyze(path)
@@ -0,0 +1,334 @@
+"""
+End-to-end benchmark of evaluation.run_and_submit_all, fully offline.
+
+The scoring API (/questions, /files, /submit) and the web pages are served by a local HTTP
+server from the recorded fixtures in `benchmarks/fixtures/replay`, LiteLLM completions are
+replayed from `llm_script.json` after a configurable latency, DuckDuckGo results come from
+`search.json` and the media tools use the mock backend. Each concurrency level runs in a fresh
+process with empty caches and reports questions per minute, p50/p95 question latency and
+tokens per question (read back from the trace spans).
+
+    python benchmarks/bench_agent.py --concurrency 1,2,4 --llm-latency 0.2
+    python benchmarks/bench_agent.py --save baseline.json
+    python benchmarks/bench_agent.py --compare baseline.json --tolerance 0.25   # exits 1 on regression
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT_DIR, "benchmarks", "fixtures")
+REPLAY_DIR = os.path.join(FIXTURES_DIR, "replay")
+
+sys.path.insert(0, ROOT_DIR)
+
+
+def load_fixture(name: str):
+    with open(os.path.join(REPLAY_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- Local stand-in for the scoring API and the web ---
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    questions = load_fixture("questions.json")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data, status: int = 200):
+        self._send(status, json.dumps(data).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        if self.path == "/questions":
+            # The real API does not expose the expected answers
+            return self._send_json([{k: v for k, v in item.items() if k != "expected_answer"} for item in self.questions])
+        if self.path.startswith("/files/"):
+            task_id = self.path[len("/files/"):]
+            item = next((item for item in self.questions if item["task_id"] == task_id and item["file_name"]), None)
+            if item is None:
+                return self._send_json({"detail": "No file path associated with task_id"}, 404)
+            with open(os.path.join(REPLAY_DIR, "files", item["file_name"]), "rb") as f:
+                return self._send(200, f.read(), "application/octet-stream")
+        if self.path.startswith("/pages/"):
+            path = os.path.join(FIXTURES_DIR, os.path.basename(self.path))
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    return self._send(200, f.read(), "text/html; charset=utf-8")
+        self._send_json({"detail": "Not Found"}, 404)
+
+    def do_POST(self):
+        if self.path != "/submit":
+            return self._send_json({"detail": "Not Found"}, 404)
+        submission = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        expected = {item["task_id"]: item["expected_answer"] for item in self.questions}
+        correct = sum(
+            1 for answer in submission["answers"]
+            if str(answer["submitted_answer"]).strip().lower() == expected.get(answer["task_id"], "").lower()
+        )
+        total = len(submission["answers"])
+        self._send_json({
+            "username": submission["username"],
+            "score": round(100 * correct / len(expected), 1),
+            "correct_count": correct,
+            "total_attempted": total,
+            "message": "Replay submission scored locally.",
+        })
+
+
+def start_server() -> tuple[ThreadingHTTPServer, str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ReplayHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Fake LLM and search backends (installed in the worker process) ---
+
+def message_text(message) -> str:
+    content = message.get("content") if isinstance(message, dict) else getattr(message, "content", message)
+    if isinstance(content, list):
+        return "\n".join(part.get("text") or "" for part in content if isinstance(part, dict))
+    return str(content or "")
+
+
+class ReplayLLM:
+    """
+    Replays the scripted completions: the calling agent is recognized from its system prompt,
+    the script from the task, and the step from the number of code actions already in memory.
+    Scripts with "fast_steps" answer differently when called with the fast model of the router.
+    """
+
+    def __init__(self, base_url: str, latency: float):
+        self.fixture = load_fixture("llm_script.json")
+        self.base_url = base_url
+        self.latency = latency
+
+    def respond(self, messages, stop=None, fast: bool = False) -> str:
+        texts = [(message.get("role"), message_text(message)) for message in messages]
+        everything = "\n".join(text for _, text in texts)
+        if "<end_plan>" in (stop or []):
+            return self.fixture["plan"]
+        if "YOUR FINAL ANSWER" in everything:
+            # The verifier agrees with the proposed answer and rewrites it in the expected format
+            proposed = re.search(r"Proposed answer: (.*)", everything)
+            answer = proposed.group(1) if proposed else ""
+            if answer.rstrip(".") == self.fixture["fallback"].rstrip("."):
+                return self.fixture["reject"]
+            for script in self.fixture["scripts"]:
+                if script["match"] in everything and script.get("verified_answer"):
+                    answer = script["verified_answer"]
+            return Template(self.fixture["verifier"]).safe_substitute(answer=answer)
+        if "got stuck" in everything:
+            return self.fixture["fallback"]
+
+        system = next((text for role, text in texts if role == "system"), "")
+        agent = "manager" if "calculator_tool" in system else "web_search_agent"
+        task = next((text for role, text in texts if role == "user"), "")
+        steps_done = sum(1 for role, text in texts if role == "assistant" and "<code>" in text)
+        for script in self.fixture["scripts"]:
+            if script["agent"] == agent and script["match"] in task:
+                steps = script.get("fast_steps", script["steps"]) if fast else script["steps"]
+                step = steps[min(steps_done, len(steps) - 1)]
+                file_path = re.search(r"The file path is: (\S+)", task)
+                return Template(step).safe_substitute(base_url=self.base_url, file_path=file_path.group(1) if file_path else "")
+        return f'<code>\nfinal_answer("{self.fixture["fallback"]}")\n</code>'
+
+    def install(self):
+        import litellm
+        from model_router import FAST_MODEL
+        from scheduler import estimate_message_tokens, estimate_tokens
+
+        real_completion = litellm.completion
+
+        def completion(model, messages, stop=None, **kwargs):
+            text = self.respond(messages, stop, fast=model == FAST_MODEL)
+            time.sleep(self.latency)
+            response = real_completion(model=model, messages=messages, mock_response=text)
+            # The mock usage is a constant, estimate it so tokens per question are meaningful
+            response.usage.prompt_tokens = estimate_message_tokens(messages)
+            response.usage.completion_tokens = estimate_tokens(text)
+            response.usage.total_tokens = response.usage.prompt_tokens + response.usage.completion_tokens
+            return response
+
+        litellm.completion = completion
+
+
+def install_search_fixture(base_url: str):
+    from smolagents import DuckDuckGoSearchTool
+
+    results = load_fixture("search.json")
+
+    def forward(self, query: str) -> str:
+        return Template(results.get(query, "No results found.")).safe_substitute(base_url=base_url)
+
+    DuckDuckGoSearchTool.forward = forward
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+
+def summarize_traces(trace_path: str) -> dict:
+    questions = {}
+    tokens = defaultdict(lambda: [0, 0, 0])
+    with open(trace_path, "r", encoding="utf-8") as f:
+        for line in f:
+            span = json.loads(line)
+            if span["kind"] == "question":
+                questions[span["trace_id"]] = span["duration_s"]
+            elif span["kind"] == "llm":
+                usage = tokens[span["trace_id"]]
+                usage[0] += span["attributes"].get("input_tokens", 0)
+                usage[1] += span["attributes"].get("output_tokens", 0)
+                usage[2] += 1
+    latencies = list(questions.values())
+    count = len(latencies) or 1
+    return {
+        "questions": len(latencies),
+        "p50_s": percentile(latencies, 0.5),
+        "p95_s": percentile(latencies, 0.95),
+        "tokens_in_per_question": sum(tokens[trace_id][0] for trace_id in questions) / count,
+        "tokens_out_per_question": sum(tokens[trace_id][1] for trace_id in questions) / count,
+        "llm_calls_per_question": sum(tokens[trace_id][2] for trace_id in questions) / count,
+    }
+
+
+def run_worker(args):
+    ReplayLLM(args.base_url, args.llm_latency).install()
+    install_search_fixture(args.base_url)
+    import evaluation
+
+    start = time.perf_counter()
+    status, _ = evaluation.run_and_submit_all("bench")
+    elapsed = time.perf_counter() - start
+    result = summarize_traces(os.environ["TRACE_PATH"])
+    score = re.search(r"Overall Score: ([\d.]+)%", status or "")
+    result.update({
+        "concurrency": args.worker_concurrency,
+        "elapsed_s": elapsed,
+        "questions_per_minute": 60 * result["questions"] / elapsed if elapsed else 0.0,
+        "score": float(score.group(1)) if score else None,
+        "status": status,
+    })
+    with open(args.result_file, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def run_level(base_url: str, concurrency: int, args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench_agent_") as work_dir:
+        env = dict(os.environ)
+        env.update({
+            "SCORING_API_URL": base_url,
+            "AGENT_CONCURRENCY": str(concurrency),
+            "GEMINI_RPM": str(args.rpm),
+            "GEMINI_TPM": str(args.tpm),
+            "FAST_GEMINI_RPM": str(args.rpm),
+            "FAST_GEMINI_TPM": str(args.tpm),
+            "GEMINI_API_KEY": "bench",
+            "MEDIA_BACKEND": "mock",
+            "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+            "TRACE_PATH": os.path.join(work_dir, "traces.jsonl"),
+            "ANSWER_STORE_PATH": os.path.join(work_dir, "answers_cache.jsonl"),
+            "WEB_CACHE_DIR": os.path.join(work_dir, "web"),
+            "FILE_STORE_DIR": os.path.join(work_dir, "files"),
+            "MEDIA_CACHE_DIR": os.path.join(work_dir, "media"),
+            "TABLE_CACHE_DIR": os.path.join(work_dir, "tables"),
+            "SPACE_ID": "bench/agent",
+        })
+        result_file = os.path.join(work_dir, "result.json")
+        command = [sys.executable, os.path.abspath(__file__), "--worker", "--base-url", base_url,
+                   "--worker-concurrency", str(concurrency), "--llm-latency", str(args.llm_latency),
+                   "--result-file", result_file]
+        completed = subprocess.run(command, env=env, cwd=work_dir,
+                                   stdout=None if args.verbose else subprocess.DEVNULL,
+                                   stderr=None if args.verbose else subprocess.PIPE, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Benchmark worker failed with concurrency {concurrency}:\n{completed.stderr or ''}")
+        with open(result_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def compare(results: list[dict], baseline_path: str, tolerance: float) -> list[str]:
+    """Returns the regressions of `results` against a file saved with --save."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result["concurrency"]: result for result in json.load(f)}
+    regressions = []
+    for result in results:
+        reference = baseline.get(result["concurrency"])
+        if reference is None:
+            continue
+        if result["questions_per_minute"] < reference["questions_per_minute"] * (1 - tolerance):
+            regressions.append(f"c={result['concurrency']}: {result['questions_per_minute']:.1f} questions/min "
+                               f"(baseline {reference['questions_per_minute']:.1f})")
+        for metric in ("p95_s", "tokens_in_per_question", "llm_calls_per_question"):
+            if result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"c={result['concurrency']}: {metric} {result[metric]:.2f} (baseline {reference[metric]:.2f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,2,4", help="comma separated concurrency levels to run")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds added to every fake completion")
+    parser.add_argument("--rpm", type=float, default=0, help="requests per minute given to the rate limiter, 0 for no limit")
+    parser.add_argument("--tpm", type=float, default=0, help="tokens per minute given to the rate limiter, 0 for no limit")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file written by --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression for --compare")
+    parser.add_argument("--verbose", action="store_true", help="show the output of the agent runs")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-concurrency", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args)
+
+    server, base_url = start_server()
+    results = []
+    print(f"{'concurrency':>11} {'questions':>9} {'q/min':>7} {'p50 s':>7} {'p95 s':>7} {'tok in/q':>9} {'tok out/q':>9} {'llm/q':>6} {'score':>6}")
+    try:
+        for concurrency in [int(level) for level in args.concurrency.split(",")]:
+            result = run_level(base_url, concurrency, args)
+            results.append(result)
+            print(f"{concurrency:>11} {result['questions']:>9} {result['questions_per_minute']:>7.1f} {result['p50_s']:>7.2f} "
+                  f"{result['p95_s']:>7.2f} {result['tokens_in_per_question']:>9.0f} {result['tokens_out_per_question']:>9.0f} "
+                  f"{result['llm_calls_per_question']:>6.1f} {result['score'] if result['score'] is not None else 'n/a':>6}")
+    finally:
+        server.shutdown()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+        print(f"Results saved to {args.save}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
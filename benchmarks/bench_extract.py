@@ -0,0 +1,65 @@
+"""
+Benchmark of the visit_webpage extraction modes on saved HTML pages.
+
+For every fixture it reports the bytes read, the tokens sent to the LLM and the time taken by
+the full markdownify conversion and by the streaming, relevance-trimmed extraction.
+
+    python benchmarks/bench_extract.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_extract import extract_relevant  # noqa: E402
+from scheduler import estimate_tokens  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# fixture name -> question asked about the page
+QUERIES = {
+    "wiki_discography.html": "How many studio albums were released between 2000 and 2009?",
+    "news_listing.html": "When did the new bridge open?",
+}
+
+
+def iter_chunks(html: str, chunk_size: int = 64 * 1024):
+    for start in range(0, len(html), chunk_size):
+        yield html[start:start + chunk_size]
+
+
+def timed(fn, repeat: int = 5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    try:
+        from markdownify import markdownify
+    except ImportError:
+        markdownify = None
+
+    print(f"{'fixture':<26} {'mode':<10} {'bytes in':>10} {'tokens out':>11} {'ms':>9}")
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+            html = f.read()
+        bytes_in = len(html.encode("utf-8"))
+        query = QUERIES.get(name, "")
+
+        if markdownify is not None:
+            markdown, seconds = timed(lambda: markdownify(html).strip())
+            print(f"{name:<26} {'full':<10} {bytes_in:>10} {estimate_tokens(markdown):>11} {seconds * 1000:>9.1f}")
+        excerpt, seconds = timed(lambda: extract_relevant(iter_chunks(html), query))
+        print(f"{name:<26} {'excerpt':<10} {bytes_in:>10} {estimate_tokens(excerpt):>11} {seconds * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
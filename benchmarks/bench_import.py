@@ -0,0 +1,125 @@
+"""
+Cold start benchmark: time to import the app modules in a fresh interpreter.
+
+Each module is imported `--repeat` times in a new `python -X importtime` process; the report
+gives the median cumulative import time, the slowest imports it pulls in and which heavy
+dependencies (gradio, litellm, pandas...) got loaded. The agent core (`agent`, `evaluation`)
+should load none of them: they are imported when the model, a table or the UI is first used.
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --modules agent_tools,evaluation --top 10
+    python benchmarks/bench_import.py --save baseline.json
+    python benchmarks/bench_import.py --compare baseline.json --tolerance 0.25   # exits 1 on regression
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = "agent_tools,agent,evaluation,app"
+HEAVY_MODULES = ("gradio", "litellm", "pandas", "numpy", "markdownify", "transformers", "torch", "openpyxl", "pydub")
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def import_once(module: str) -> dict:
+    """Imports `module` in a fresh interpreter, returns its cumulative time and the slowest imports."""
+    env = dict(os.environ)
+    # app.py builds the Gradio UI on import: make its login button behave as on a Space
+    # instead of requiring a Hugging Face login
+    env.update({
+        "SYSTEM": "spaces",
+        "SPACE_ID": env.get("SPACE_ID", "bench/agent"),
+        "OAUTH_CLIENT_ID": env.get("OAUTH_CLIENT_ID", "bench"),
+        "OAUTH_CLIENT_SECRET": env.get("OAUTH_CLIENT_SECRET", "bench"),
+        "OAUTH_SCOPES": env.get("OAUTH_SCOPES", "openid profile"),
+        "OPENID_PROVIDER_URL": env.get("OPENID_PROVIDER_URL", "http://localhost"),
+    })
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT_DIR, env=env,
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+    imports = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            imports[match.group(4)] = int(match.group(2))
+    heavy = completed.stdout.strip().splitlines()[-1] if completed.stdout.strip() else ""
+    return {
+        "total_s": imports.get(module, 0) / 1e6,
+        "imports": imports,
+        "heavy": [name for name in heavy.split(",") if name],
+    }
+
+
+def measure(module: str, repeat: int, top: int) -> dict:
+    runs = [import_once(module) for _ in range(repeat)]
+    # Top-level packages only, their submodules are already included in the cumulative time
+    slowest = sorted(
+        ((name, micros) for name, micros in runs[-1]["imports"].items() if "." not in name and name != module),
+        key=lambda item: item[1], reverse=True,
+    )[:top]
+    return {
+        "module": module,
+        "median_s": statistics.median(run["total_s"] for run in runs),
+        "best_s": min(run["total_s"] for run in runs),
+        "heavy": runs[-1]["heavy"],
+        "slowest": [{"name": name, "seconds": micros / 1e6} for name, micros in slowest],
+    }
+
+
+def compare(results: list[dict], baseline_path: str, tolerance: float) -> list[str]:
+    """Returns the regressions of `results` against a file saved with --save."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result["module"]: result for result in json.load(f)}
+    regressions = []
+    for result in results:
+        reference = baseline.get(result["module"])
+        if reference is None:
+            continue
+        if result["median_s"] > reference["median_s"] * (1 + tolerance):
+            regressions.append(f"{result['module']}: {result['median_s']:.2f}s (baseline {reference['median_s']:.2f}s)")
+        new_heavy = sorted(set(result["heavy"]) - set(reference["heavy"]))
+        if new_heavy:
+            regressions.append(f"{result['module']}: now imports {', '.join(new_heavy)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", default=DEFAULT_MODULES, help="comma separated modules to import")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh imports per module, the median is reported")
+    parser.add_argument("--top", type=int, default=5, help="number of slowest imports shown per module")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file written by --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression for --compare")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'module':<14} {'median s':>8} {'best s':>7}  heavy dependencies loaded")
+    for module in args.modules.split(","):
+        result = measure(module, args.repeat, args.top)
+        results.append(result)
+        print(f"{module:<14} {result['median_s']:>8.2f} {result['best_s']:>7.2f}  {', '.join(result['heavy']) or '-'}")
+        print("    slowest: " + ", ".join(f"{item['name']} {item['seconds']:.2f}s" for item in result["slowest"]))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+        print(f"Results saved to {args.save}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Headless evaluation runner: fetches the questions, runs the agents and submits the answers
+like the 'Run Evaluation' and 'Submit Cached Answers' buttons of the app, without a browser.
+
+Every answer is appended to the --output JSONL file as soon as it is produced, so a long batch
+can be followed with `tail -f` and an interrupted one loses nothing (answers are also kept in
+the answer store: rerunning only answers the missing questions, unless --fresh).
+
+    python cli.py --username my-hf-user
+    python cli.py --dry-run --concurrency 8 --limit 20 --output results.jsonl
+    python cli.py --dry-run --fresh --tasks <task_id>,<task_id> --cache-dir /tmp/agent-cache
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def configure(args):
+    """The modules read their settings from the environment at import: set it before importing them."""
+    if args.concurrency:
+        os.environ["AGENT_CONCURRENCY"] = str(args.concurrency)
+    if args.api_url:
+        os.environ["SCORING_API_URL"] = args.api_url
+    if args.cache_dir:
+        os.environ["WEB_CACHE_DIR"] = os.path.join(args.cache_dir, "web")
+        os.environ["FILE_STORE_DIR"] = os.path.join(args.cache_dir, "files")
+        os.environ["MEDIA_CACHE_DIR"] = os.path.join(args.cache_dir, "media")
+        os.environ["TABLE_CACHE_DIR"] = os.path.join(args.cache_dir, "tables")
+        os.environ["ANSWER_STORE_PATH"] = os.path.join(args.cache_dir, "answers_cache.jsonl")
+    if args.trace_path is not None:
+        os.environ["TRACE_PATH"] = args.trace_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--username", help="Hugging Face username the answers are submitted for")
+    parser.add_argument("--agent-code", help="link to the agent code sent with the submission (default: from SPACE_ID)")
+    parser.add_argument("--concurrency", type=int, help="questions answered in parallel (default: AGENT_CONCURRENCY or 4)")
+    parser.add_argument("--tasks", help="comma separated task ids to run, all questions by default")
+    parser.add_argument("--limit", type=int, help="only run the first N questions")
+    parser.add_argument("--dry-run", action="store_true", help="run the agents but don't submit the answers")
+    parser.add_argument("--fresh", action="store_true", help="answer every question again, ignoring the answer store")
+    parser.add_argument("--cache-dir", help="directory for the web, attachment, media, table and answer caches")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file the results are appended to")
+    parser.add_argument("--trace-path", help="JSONL file the trace spans are written to (default: TRACE_PATH, none when unset)")
+    parser.add_argument("--api-url", help="scoring API (default: SCORING_API_URL or the course API)")
+    args = parser.parse_args()
+    if not args.dry_run and not args.username:
+        parser.error("--username is required to submit, use --dry-run to only run the agents")
+
+    configure(args)
+    from evaluation import run_evaluation, submit_answers
+    from jobs import Job
+
+    class BatchJob(Job):
+        """Job appending every result to the output file and printing the progress."""
+
+        def add_result(self, key, result, reused: bool = False):
+            super().add_result(key, result, reused=reused)
+            log_entry, submitted_answer = result
+            record = {
+                "job_id": self.id,
+                "task_id": key,
+                "question": log_entry.get("Question"),
+                "submitted_answer": submitted_answer,
+                "result": log_entry.get("Submitted Answer"),
+                "trace": log_entry.get("Trace"),
+                "reused": reused,
+                "timestamp": time.time(),
+            }
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+            print(f"[{self.completed}/{self.total}] {key}: {log_entry.get('Submitted Answer')} ({log_entry.get('Trace')})")
+
+    job = BatchJob(args.username or "cli")
+    job.update(status="running")
+    start = time.perf_counter()
+    run_evaluation(
+        job,
+        task_ids=set(args.tasks.split(",")) if args.tasks else None,
+        limit=args.limit,
+        reuse_answers=not args.fresh,
+    )
+    elapsed = time.perf_counter() - start
+    computed = job.completed - job.reused
+    print(job.progress_text())
+    print(f"{computed} questions answered in {elapsed:.1f}s ({60 * computed / elapsed if elapsed else 0:.1f} questions/min), "
+          f"{job.reused} reused, results in {args.output}")
+    if job.status == "failed" or job.outcome is None:
+        sys.exit(1)
+    if args.dry_run:
+        return
+
+    answers_payload, results_log = job.outcome
+    agent_code = args.agent_code or f"https://huggingface.co/spaces/{os.getenv('SPACE_ID')}/tree/main"
+    status, _ = submit_answers(args.username, agent_code, answers_payload, results_log)
+    print(status)
+    if not status.startswith("Submission Successful"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+Process pool running the code generated by the agents.
+
+Every ProcessPythonExecutor owns a worker process with its own LocalPythonExecutor, so the
+interpreter state is kept between the steps of a question, and steps of different questions
+run on separate cores. Tools stay in the main process: the worker calls them through the pipe.
+A step that runs over its time, CPU or memory limit only costs its worker, which is killed and
+replaced by a pre-warmed spare.
+"""
+import atexit
+import os
+import pickle
+import signal
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection
+
+from smolagents import LocalPythonExecutor
+from smolagents.local_python_executor import CodeOutput, InterpreterError
+
+# "process" runs the manager's code in the worker processes, "local" in the agent's thread as before
+CODE_EXECUTOR = os.getenv("CODE_EXECUTOR", "process" if os.name == "posix" else "local")
+CODE_TIMEOUT_SECONDS = float(os.getenv("CODE_TIMEOUT_SECONDS", "30"))
+CODE_CPU_SECONDS = int(os.getenv("CODE_CPU_SECONDS", "30"))
+CODE_MEMORY_MB = int(os.getenv("CODE_MEMORY_MB", "2048"))
+# Spare workers kept started, so a killed worker is replaced without waiting for the imports
+CODE_SPARE_WORKERS = int(os.getenv("CODE_SPARE_WORKERS", "1"))
+# Imported by every worker before it is used: the first pandas step doesn't pay for the import
+CODE_WORKER_PRELOAD = [name for name in os.getenv("CODE_WORKER_PRELOAD", "numpy,pandas").split(",") if name]
+WORKER_START_TIMEOUT = 120
+
+
+def _picklable(value):
+    """`value` itself when it can be sent through the pipe, its string otherwise."""
+    try:
+        pickle.dumps(value)
+        return value
+    except Exception:
+        return str(value)
+
+
+# --- Worker process ---
+
+def _set_limit(name: str, soft: int):
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = getattr(resource, name)
+    _, hard = resource.getrlimit(limit)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(limit, (soft, hard))
+
+
+def _cpu_time() -> float:
+    try:
+        import resource
+    except ImportError:
+        return time.process_time()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def worker_main(fd: int, memory_mb: int):
+    conn = Connection(fd)
+    for name in CODE_WORKER_PRELOAD:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+    # Set after the imports, which map a lot of address space
+    _set_limit("RLIMIT_AS", memory_mb * 1024 * 1024)
+    conn.send(("ready", os.getpid()))
+
+    def proxy(name):
+        def call(*args, **kwargs):
+            conn.send(("call", name, args, kwargs))
+            kind, value = conn.recv()
+            if kind == "raise":
+                raise value
+            return value
+        call.__name__ = name
+        return call
+
+    def new_executor(authorized_imports, max_print_outputs_length):
+        # The parent enforces the time limit: no timeout thread here
+        return LocalPythonExecutor(authorized_imports, max_print_outputs_length=max_print_outputs_length, timeout_seconds=None)
+
+    # agent.run sends the variables before the tools: start with a bare executor, "init" replaces it
+    executor = new_executor([], None)
+    executor.send_tools({})
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return  # The parent is gone
+        kind = message[0]
+        if kind == "init":
+            _, authorized_imports, max_print_outputs_length, tool_names = message
+            state = executor.state
+            executor = new_executor(authorized_imports, max_print_outputs_length)
+            executor.state = state
+            executor.send_tools({name: proxy(name) for name in tool_names})
+        elif kind == "variables":
+            executor.send_variables(message[1])
+        elif kind == "reset":
+            executor.state = {"__name__": "__main__"}
+            executor.custom_tools = {}
+        elif kind == "run":
+            _, code_action, cpu_seconds = message
+            start_cpu = _cpu_time()
+            # RLIMIT_CPU counts the whole life of the process: the step gets cpu_seconds more
+            _set_limit("RLIMIT_CPU", int(start_cpu + cpu_seconds) + 1)
+            try:
+                output = executor(code_action)
+                reply = ("result", _picklable(output.output), output.logs, output.is_final_answer, _cpu_time() - start_cpu)
+            except Exception as e:
+                logs = str(executor.state.get("_print_outputs", ""))
+                reply = ("error", f"{e}" if isinstance(e, InterpreterError) else f"{type(e).__name__}: {e}", logs, _cpu_time() - start_cpu)
+            conn.send(reply)
+
+
+# --- Main process ---
+
+class CodeWorker:
+    """Handle on a worker process and its end of the pipe."""
+
+    def __init__(self, memory_mb: int = CODE_MEMORY_MB):
+        self.conn, child_conn = Pipe()
+        env = dict(os.environ)
+        # One thread per worker for the numeric libraries: the parallelism comes from the processes
+        for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+            env.setdefault(name, "1")
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(child_conn.fileno()), str(memory_mb)],
+            pass_fds=[child_conn.fileno()], env=env,
+        )
+        child_conn.close()
+        self.pid = self.process.pid
+        self.ready = False
+
+    def wait_ready(self, timeout: float = WORKER_START_TIMEOUT):
+        if self.ready:
+            return
+        if not self.conn.poll(timeout):
+            raise InterpreterError(f"Code worker {self.pid} did not start within {timeout:.0f}s")
+        kind, _ = self.conn.recv()
+        self.ready = kind == "ready"
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def exit_reason(self) -> str:
+        returncode = self.process.wait()
+        if returncode == -signal.SIGXCPU:
+            return "exceeded its CPU time limit"
+        if returncode == -signal.SIGKILL:
+            return "was killed (out of memory?)"
+        return f"crashed (exit code {returncode})"
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+        self.conn.close()
+
+
+class CodeWorkerPool:
+    """Starts the workers and keeps `spares` of them ready to replace a killed one."""
+
+    def __init__(self, spares: int = CODE_SPARE_WORKERS, memory_mb: int = CODE_MEMORY_MB):
+        self.spares = spares
+        self.memory_mb = memory_mb
+        self._spare_workers = []
+        self._all_workers = set()
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def _start(self) -> CodeWorker:
+        worker = CodeWorker(self.memory_mb)
+        with self._lock:
+            self._all_workers.add(worker)
+        return worker
+
+    def _refill(self):
+        with self._lock:
+            missing = self.spares - len(self._spare_workers)
+        for _ in range(missing):
+            worker = self._start()
+            with self._lock:
+                self._spare_workers.append(worker)
+
+    def acquire(self) -> CodeWorker:
+        with self._lock:
+            worker = None
+            while self._spare_workers and worker is None:
+                candidate = self._spare_workers.pop(0)
+                worker = candidate if candidate.alive() else None
+        worker = worker or self._start()
+        threading.Thread(target=self._refill, daemon=True).start()
+        return worker
+
+    def release(self, worker: CodeWorker):
+        worker.kill()
+        with self._lock:
+            self._all_workers.discard(worker)
+
+    def shutdown(self):
+        with self._lock:
+            workers = list(self._all_workers)
+            self._all_workers.clear()
+            self._spare_workers.clear()
+        for worker in workers:
+            worker.kill()
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> CodeWorkerPool:
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = CodeWorkerPool()
+        return _worker_pool
+
+
+class ProcessPythonExecutor(LocalPythonExecutor):
+    """
+    Drop-in replacement of LocalPythonExecutor running the code in a worker process, with a wall
+    time limit per step (`timeout_seconds`, not counting the time spent in tools), a CPU time
+    limit per step and a memory limit per worker.
+    """
+
+    def __init__(self, additional_authorized_imports: list[str], max_print_outputs_length: int | None = None,
+                 additional_functions: dict | None = None, timeout_seconds: float | None = CODE_TIMEOUT_SECONDS,
+                 cpu_seconds: int = CODE_CPU_SECONDS, pool: CodeWorkerPool | None = None):
+        super().__init__(additional_authorized_imports, max_print_outputs_length=max_print_outputs_length,
+                         additional_functions=additional_functions, timeout_seconds=timeout_seconds)
+        self.cpu_seconds = cpu_seconds
+        self.pool = pool or get_worker_pool()
+        self._tool_names = []
+        self._variables = {}
+        # Started now, the imports run while the agent waits for its first LLM answer
+        self.worker = self.pool.acquire()
+
+    def _send(self, message):
+        if self.worker is None or not self.worker.alive():
+            self._replace_worker()
+        self.worker.conn.send(message)
+
+    def _init_message(self):
+        return ("init", self.authorized_imports, self.max_print_outputs_length, self._tool_names)
+
+    def _replace_worker(self):
+        """Fresh worker with the tools and variables, but none of the state of the previous steps."""
+        if self.worker is not None:
+            self.pool.release(self.worker)
+        self.worker = self.pool.acquire()
+        self.worker.conn.send(self._init_message())
+        if self._variables:
+            self.worker.conn.send(("variables", self._variables))
+
+    def send_tools(self, tools: dict):
+        super().send_tools(tools)
+        self._tool_names = list(tools) + list(self.additional_functions)
+        self._send(self._init_message())
+
+    def send_variables(self, variables: dict):
+        super().send_variables(variables)
+        self._variables.update({name: value for name, value in variables.items() if _picklable(value) is value})
+        self._send(("variables", self._variables))
+
+    def reset(self):
+        self.state = {"__name__": "__main__"}
+        self.custom_tools = {}
+        self._variables = {}
+        self._send(("reset",))
+
+    def _call_tool(self, name: str, args, kwargs):
+        try:
+            reply = ("return", self.static_tools[name](*args, **kwargs))
+        except Exception as e:
+            reply = ("raise", e if _picklable(e) is e else RuntimeError(f"{type(e).__name__}: {e}"))
+        try:
+            self.worker.conn.send(reply)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            self.worker.conn.send((reply[0], str(reply[1])))
+
+    def _fail(self, reason: str):
+        self._replace_worker()
+        raise InterpreterError(
+            f"Code execution {reason}. The interpreter was restarted: variables and imports of the previous steps are lost."
+        )
+
+    def __call__(self, code_action: str) -> CodeOutput:
+        from tracing import tracer
+
+        self._send(("run", code_action, self.cpu_seconds))
+        worker = self.worker
+        with tracer.span("code", kind="code", worker_pid=worker.pid) as span:
+            worker.wait_ready()
+            deadline = time.monotonic() + self.timeout_seconds if self.timeout_seconds else None
+            while True:
+                try:
+                    timeout = max(0.0, deadline - time.monotonic()) if deadline else None
+                    message = worker.conn.recv() if worker.conn.poll(timeout) else None
+                except (EOFError, OSError):
+                    span.add(worker_lost=1)
+                    self._fail(f"failed: the worker process {worker.exit_reason()}")
+                if message is None:
+                    span.add(worker_lost=1)
+                    self._fail(f"timed out after {self.timeout_seconds:.0f}s")
+                if message[0] == "call":
+                    # Tools run here, in the agent's thread: their time doesn't count for the step
+                    start = time.monotonic()
+                    self._call_tool(*message[1:])
+                    if deadline:
+                        deadline += time.monotonic() - start
+                    continue
+                if message[0] == "result":
+                    _, output, logs, is_final_answer, cpu_time = message
+                    span.add(cpu_s=round(cpu_time, 3))
+                    self.state["_print_outputs"] = logs
+                    return CodeOutput(output=output, logs=logs, is_final_answer=is_final_answer)
+                _, error, logs, cpu_time = message
+                span.add(cpu_s=round(cpu_time, 3))
+                self.state["_print_outputs"] = logs
+                raise InterpreterError(error)
+
+    def cleanup(self):
+        if self.worker is not None:
+            self.pool.release(self.worker)
+            self.worker = None
+
+
+if __name__ == "__main__":
+    worker_main(int(sys.argv[1]), int(sys.argv[2]))
@@ -0,0 +1,280 @@
+import datetime
+import json
+import os
+
+import requests
+from dotenv import load_dotenv
+
+from agent import BasicAgent, get_agent_pool
+from answer_check import answer_verifier
+from answer_store import AnswerStore, config_fingerprint
+from audio_transcribe import describe_attachment
+from http_cache import web_cache
+from http_client import http_client
+from jobs import Job, JobManager
+from media import media_analyzer
+from model_router import router_stats
+from scheduler import DEFAULT_CONCURRENCY, run_concurrently
+from tracing import tracer
+from utils import AttachmentStore
+
+load_dotenv()
+
+# (Keep Constants as is)
+# --- Constants ---
+DEFAULT_API_URL = os.getenv("SCORING_API_URL", "https://agents-course-unit4-scoring.hf.space")
+
+
+# Evaluations run in the background: a browser disconnect doesn't stop them, and extra runs wait in the queue
+job_manager = JobManager()
+
+
+def run_evaluation(job: Job, task_ids: list | None = None, limit: int | None = None, reuse_answers: bool = True):
+    """
+    Fetches all questions and runs the BasicAgent on the ones without a cached answer, recording
+    every answer on `job` as soon as it is produced. Nothing is submitted: the job outcome is
+    (answers_payload, results_log), ready for submit_answers.
+    `task_ids` and `limit` restrict the run to a subset of the questions, and `reuse_answers=False`
+    answers every question again even if the answer store has it.
+    """
+    api_url = DEFAULT_API_URL
+    questions_url = f"{api_url}/questions"
+
+    # 1. Instantiate Agent ( modify this part to create your agent)
+    job.update(message="Building the agents...")
+    try:
+        agent_pool = get_agent_pool()
+        agent_fingerprint = config_fingerprint(BasicAgent.config)
+    except Exception as e:
+        print(f"Error instantiating agent: {e}")
+        return job.finish(message=f"Error initializing agent: {e}", failed=True)
+
+    # 2. Fetch Questions
+    print(f"Fetching questions from: {questions_url}")
+    job.update(message="Fetching questions...")
+    try:
+        response = http_client.get(questions_url, timeout=15)
+        response.raise_for_status()
+        questions_data = response.json()
+        if not questions_data:
+             print("Fetched questions list is empty.")
+             return job.finish(message="Fetched questions list is empty or invalid format.", failed=True)
+        print(f"Fetched {len(questions_data)} questions.")
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching questions: {e}")
+        return job.finish(message=f"Error fetching questions: {e}", failed=True)
+    except requests.exceptions.JSONDecodeError as e:
+         print(f"Error decoding JSON response from questions endpoint: {e}")
+         print(f"Response text: {response.text[:500]}")
+         return job.finish(message=f"Error decoding server response for questions: {e}", failed=True)
+    except Exception as e:
+        print(f"An unexpected error occurred fetching questions: {e}")
+        return job.finish(message=f"An unexpected error occurred fetching questions: {e}", failed=True)
+
+    # 3. Run your Agent
+    # Answers already in the store for this configuration are reused, only missing tasks are run
+    store = AnswerStore()
+    valid_questions = []
+    pending_questions = []
+    for item in questions_data:
+        task_id = item.get("task_id")
+        question_text = item.get("question")
+        if not task_id or question_text is None:
+            print(f"Skipping item with missing task_id or question: {item}")
+            continue
+        if task_ids is None or task_id in task_ids:
+            valid_questions.append(item)
+    if limit is not None:
+        valid_questions = valid_questions[:limit]
+    if not valid_questions:
+        return job.finish(message="No question matches the requested tasks.", failed=True)
+    job.update(total=len(valid_questions))
+    for item in valid_questions:
+        task_id = item.get("task_id")
+        question_text = item.get("question")
+        cached = store.get(task_id, question_text, agent_fingerprint, item.get("file_name")) if reuse_answers else None
+        if cached is not None:
+            log_entry = {"Task ID": task_id, "Question": question_text, "Submitted Answer": cached["submitted_answer"], "Trace": "cached"}
+            job.add_result(task_id, (log_entry, cached["submitted_answer"]), reused=True)
+        else:
+            pending_questions.append(item)
+    print(f"Reusing {job.reused} cached answers from {store.path}.")
+
+    # Attachments are downloaded in the background while the first agents already run
+    attachments = AttachmentStore(api_url=api_url)
+    attachment_futures = attachments.prefetch(pending_questions)
+    # Images and recordings are described concurrently as soon as they are downloaded
+    media_analyzer.prewarm(list(attachment_futures.values()), analyze_fn=describe_attachment)
+
+    def answer_question(item):
+        task_id = item.get("task_id")
+        # One trace per question: LLM calls, tool calls and agent steps are recorded as its spans
+        with tracer.trace(task_id=task_id, job_id=job.id) as root_span:
+            log_entry, submitted_answer = run_question(item)
+        log_entry["Trace"] = tracer.summarize(root_span.trace_id)
+        return log_entry, submitted_answer
+
+    def run_question(item):
+        task_id = item.get("task_id")
+        question_text = item.get("question")
+        if item.get("file_name"):
+            with tracer.span("wait_attachment", file_name=item.get("file_name")):
+                try:
+                    file_path = attachment_futures[task_id].result()
+                except Exception as e:
+                    # Only this question goes without its attachment, the rest of the run goes on
+                    print(f"Error fetching the attachment of task {task_id}: {e}")
+                    file_path = None
+            question_text += f" The file path is: {file_path or item.get('file_name')}"
+        # Each worker borrows a pre-built agent for the duration of the question
+        with agent_pool.acquire() as worker_agent:
+            try:
+                submitted_answer = worker_agent(question_text)
+                # Persist right away so a crash later in the run does not lose this answer
+                store.put(task_id, item.get("question"), worker_agent.fingerprint, submitted_answer, item.get("file_name"))
+                return {"Task ID": task_id, "Question": question_text, "Submitted Answer": submitted_answer}, submitted_answer
+            except Exception as e:
+                print(f"Error running agent on task {task_id}: {e}")
+                return {"Task ID": task_id, "Question": question_text, "Submitted Answer": f"AGENT ERROR: {e}"}, None
+
+    print(f"Running agent on {len(pending_questions)} questions with {DEFAULT_CONCURRENCY} workers...")
+    job.update(message=f"Running the agent on {len(pending_questions)} questions with {DEFAULT_CONCURRENCY} workers...")
+    for item, result in run_concurrently(answer_question, pending_questions, max_workers=DEFAULT_CONCURRENCY):
+        job.add_result(item.get("task_id"), result)
+    print(f"Web cache stats: {web_cache.stats()}")
+    print(f"Final answer checks: {answer_verifier.stats()}")
+    print(f"Model routing: {router_stats.stats()}")
+    if tracer.path:
+        print(f"Trace spans written to {tracer.path}")
+
+    results_log = []
+    answers_payload = []
+    # Keep the original question order in the log and the submission
+    for item in valid_questions:
+        log_entry, submitted_answer = job.results[item.get("task_id")]
+        results_log.append(log_entry)
+        if submitted_answer is not None:
+            answers_payload.append({"task_id": item.get("task_id"), "submitted_answer": submitted_answer})
+
+    if not answers_payload:
+        print("Agent did not produce any answers to submit.")
+        return job.finish(outcome=([], results_log), message="Agent did not produce any answers to submit.", failed=True)
+
+    # 6. Save answers to json
+    try:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"answers_{timestamp}.json"
+        with open(filename, "w") as f:
+            json.dump(answers_payload, f)
+        print(f"Answers saved to {filename}")
+    except Exception as e:
+        print(f"Error saving answers to file: {e}")
+
+    job.finish(outcome=(answers_payload, results_log),
+               message=f"Agent finished with {len(answers_payload)} answers, stored for submission.")
+
+
+def results_table(results_log: list):
+    """The results log as the table shown in the UI (pandas is only imported here)."""
+    import pandas as pd
+
+    return pd.DataFrame(results_log)
+
+
+def job_results_table(job: Job):
+    return results_table([log_entry for log_entry, _ in list(job.results.values())])
+
+
+def run_and_submit_all(username: str):
+    """
+    Fetches all questions, runs the BasicAgent on them, submits all answers,
+    and returns the status and the results. Blocks until the end of the run (used by the benchmarks).
+    """
+    # --- Determine HF Space Runtime URL and Repo URL ---
+    space_id = os.getenv("SPACE_ID") # Get the SPACE_ID for sending link to the code
+
+    # In the case of an app running as a hugging Face space, this link points toward your codebase ( usefull for others so please keep it public)
+    agent_code = f"https://huggingface.co/spaces/{space_id}/tree/main"
+    print(agent_code)
+
+    job = Job(username)
+    job.update(status="running")
+    run_evaluation(job)
+    if job.status == "failed" or job.outcome is None:
+        return job.message, job_results_table(job) if job.results else None
+    answers_payload, results_log = job.outcome
+    return submit_answers(username, agent_code, answers_payload, results_log)
+
+
+def submit_answers(username: str, agent_code: str, answers_payload: list, results_log: list):
+    """
+    Submits the answers to the scoring API and returns the status message and the results table.
+    """
+    submit_url = f"{DEFAULT_API_URL}/submit"
+
+    # 4. Prepare Submission 
+    submission_data = {"username": username.strip(), "agent_code": agent_code, "answers": answers_payload}
+    status_update = f"Agent finished. Submitting {len(answers_payload)} answers for user '{username}'..."
+    print(status_update)
+
+    # 5. Submit
+    print(f"Submitting {len(answers_payload)} answers to: {submit_url}")
+    try:
+        response = http_client.post(submit_url, json=submission_data, timeout=60)
+        response.raise_for_status()
+        result_data = response.json()
+        final_status = (
+            f"Submission Successful!\n"
+            f"User: {result_data.get('username')}\n"
+            f"Overall Score: {result_data.get('score', 'N/A')}% "
+            f"({result_data.get('correct_count', '?')}/{result_data.get('total_attempted', '?')} correct)\n"
+            f"Message: {result_data.get('message', 'No message received.')}"
+        )
+        print("Submission successful.")
+        results_df = results_table(results_log)
+        return final_status, results_df
+    except requests.exceptions.HTTPError as e:
+        error_detail = f"Server responded with status {e.response.status_code}."
+        try:
+            error_json = e.response.json()
+            error_detail += f" Detail: {error_json.get('detail', e.response.text)}"
+        except requests.exceptions.JSONDecodeError:
+            error_detail += f" Response: {e.response.text[:500]}"
+        status_message = f"Submission Failed: {error_detail}"
+        print(status_message)
+        results_df = results_table(results_log)
+        return status_message, results_df
+    except requests.exceptions.Timeout:
+        status_message = "Submission Failed: The request timed out."
+        print(status_message)
+        results_df = results_table(results_log)
+        return status_message, results_df
+    except requests.exceptions.RequestException as e:
+        status_message = f"Submission Failed: Network error - {e}"
+        print(status_message)
+        results_df = results_table(results_log)
+        return status_message, results_df
+    except Exception as e:
+        status_message = f"An unexpected error occurred during submission: {e}"
+        print(status_message)
+        results_df = results_table(results_log)
+        return status_message, results_df
+
+
+def submit_cached_answers(username: str):
+    """
+    Submits the latest stored answer of every task, for the current agent configuration,
+    without running the agent again.
+    """
+    space_id = os.getenv("SPACE_ID")
+    agent_code = f"https://huggingface.co/spaces/{space_id}/tree/main"
+
+    store = AnswerStore()
+    # Only answers of the current agent configuration, as run_evaluation reuses them
+    records = store.latest_answers(fingerprint=config_fingerprint(BasicAgent.config))
+    if not records:
+        print(f"No cached answers for the current agent configuration in {store.path}.")
+        return f"No cached answers for the current agent configuration in {store.path}. Run the evaluation first.", None
+    answers_payload = [{"task_id": record["task_id"], "submitted_answer": record["submitted_answer"]} for record in records]
+    results_log = [{"Task ID": record["task_id"], "Question": record["question"], "Submitted Answer": record["submitted_answer"]} for record in records]
+    return submit_answers(username, agent_code, answers_payload, results_log)
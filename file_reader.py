@@ -0,0 +1,373 @@
+import ast
+import csv
+import io
+import json
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from http_cache import file_digest
+
+# Upper bound of the text a single read returns to the agent
+MAX_WINDOW_CHARS = int(os.getenv("FILE_WINDOW_CHARS", "8000"))
+DEFAULT_WINDOW_LINES = 200
+MAX_LINE_CHARS = 2000
+# The line index keeps one byte offset every LINE_INDEX_STRIDE lines
+LINE_INDEX_STRIDE = 1000
+# Larger JSON documents are not parsed for the outline, only read by windows
+MAX_JSON_PARSE_BYTES = 50 * 1024 * 1024
+SAMPLE_ROWS = 5
+MAX_OUTLINE_ENTRIES = 200
+
+
+class FileReaderError(ValueError):
+    pass
+
+
+def _format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def _short(value, limit: int = 80) -> str:
+    text = json.dumps(value, ensure_ascii=False, default=str) if not isinstance(value, str) else value
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _value_type(text: str) -> str:
+    if re.fullmatch(r"[-+]?\d+", text):
+        return "int"
+    if re.fullmatch(r"[-+]?(\d+\.\d*|\.\d+|\d+)([eE][-+]?\d+)?", text):
+        return "float"
+    if re.fullmatch(r"\d{4}-\d{2}-\d{2}([ T].*)?|\d{1,2}/\d{1,2}/\d{2,4}", text):
+        return "date"
+    return "str"
+
+
+def _json_schema(value, depth: int = 0, max_depth: int = 4) -> str:
+    """One-line type of a JSON value, e.g. `list[120] of {id: int, name: str, tags: list[3] of str}`."""
+    if isinstance(value, dict):
+        if depth >= max_depth:
+            return f"object ({len(value)} keys)"
+        keys = list(value.items())[:20]
+        inner = ", ".join(f"{key}: {_json_schema(item, depth + 1, max_depth)}" for key, item in keys)
+        return "{" + inner + (", ..." if len(value) > len(keys) else "") + "}"
+    if isinstance(value, list):
+        if not value:
+            return "list[0]"
+        return f"list[{len(value)}] of {_json_schema(value[0], depth + 1, max_depth)}"
+    if isinstance(value, bool):
+        return "bool"
+    if value is None:
+        return "null"
+    return type(value).__name__
+
+
+class FileReader:
+    """
+    Bounded access to large text attachments (code, txt, csv, json, pdf). Files are read through
+    a memory map by windows of lines or bytes, so only the requested slice is decoded and sent
+    to the agent; outlines give the structure to navigate them. Line indexes, outlines and
+    extracted pdf text are cached per file content hash in a small in-memory LRU.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, kind: str, file_path: str, compute):
+        key = (kind, file_digest(file_path))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        value = compute(file_path)
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return value
+
+    # --- Raw access ---
+
+    @staticmethod
+    def _check(file_path: str) -> int:
+        if not os.path.isfile(file_path):
+            raise FileReaderError(f"File not found: {file_path}")
+        with open(file_path, "rb") as f:
+            if b"\0" in f.read(8192) and not file_path.lower().endswith(".pdf"):
+                raise FileReaderError(f"{file_path} is a binary file, it can't be read as text.")
+        return os.path.getsize(file_path)
+
+    @staticmethod
+    def _build_line_index(file_path: str) -> tuple[list[int], int]:
+        """(byte offset of every LINE_INDEX_STRIDE-th line, number of lines)."""
+        size = os.path.getsize(file_path)
+        if size == 0:
+            return [0], 0
+        offsets = [0]
+        count = 0
+        position = 0
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            while True:
+                newline = mm.find(b"\n", position)
+                if newline == -1:
+                    break
+                count += 1
+                position = newline + 1
+                if count % LINE_INDEX_STRIDE == 0:
+                    offsets.append(position)
+        return offsets, count + (1 if position < size else 0)
+
+    def line_count(self, file_path: str) -> int:
+        return self._cached("line_index", file_path, self._build_line_index)[1]
+
+    def _pdf_text(self, file_path: str) -> str:
+        def extract(path):
+            try:
+                from pypdf import PdfReader
+            except ImportError:
+                raise FileReaderError("Reading pdf files needs the pypdf package.")
+            pages = PdfReader(path).pages
+            return "\n".join(f"--- Page {number} ---\n{page.extract_text() or ''}" for number, page in enumerate(pages, 1))
+        return self._cached("pdf_text", file_path, extract)
+
+    def _window(self, lines, start_line: int, total: int) -> str:
+        """Numbered lines within MAX_WINDOW_CHARS, followed by how to read the next window."""
+        parts = []
+        used = 0
+        line_number = start_line
+        for text in lines:
+            if len(text) > MAX_LINE_CHARS:
+                text = f"{text[:MAX_LINE_CHARS]} [... line of {len(text)} characters truncated, read it with `offset`]"
+            if parts and used + len(text) > MAX_WINDOW_CHARS:
+                break
+            parts.append(f"{line_number:>6}| {text}")
+            used += len(text) + 8
+            line_number += 1
+        end_line = start_line + len(parts) - 1
+        header = f"Lines {start_line}-{end_line} of {total}"
+        if end_line < total:
+            header += f" (continue with start_line={end_line + 1})"
+        return header + "\n" + "\n".join(parts)
+
+    def read_lines(self, file_path: str, start_line: int | None = None, num_lines: int | None = None) -> str:
+        """Window of `num_lines` lines from `start_line` (1-based), capped at MAX_WINDOW_CHARS."""
+        start_line = max(1, start_line or 1)
+        num_lines = max(1, num_lines or DEFAULT_WINDOW_LINES)
+        size = self._check(file_path)
+        if file_path.lower().endswith(".pdf"):
+            lines = self._pdf_text(file_path).splitlines()
+            if start_line > len(lines):
+                raise FileReaderError(f"The document has {len(lines)} lines.")
+            return self._window(lines[start_line - 1:start_line - 1 + num_lines], start_line, len(lines))
+
+        offsets, total = self._cached("line_index", file_path, self._build_line_index)
+        if total == 0:
+            raise FileReaderError(f"{file_path} is empty.")
+        if start_line > total:
+            raise FileReaderError(f"The file has {total} lines.")
+
+        def lines():
+            with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Seek to the closest indexed line, then skip the few lines before the window
+                position = offsets[(start_line - 1) // LINE_INDEX_STRIDE]
+                for _ in range((start_line - 1) % LINE_INDEX_STRIDE):
+                    position = mm.find(b"\n", position) + 1
+                for _ in range(num_lines):
+                    if position >= size:
+                        return
+                    end = mm.find(b"\n", position)
+                    end = size if end == -1 else end
+                    yield mm[position:end].decode("utf-8", errors="replace").rstrip("\r")
+                    position = end + 1
+
+        return self._window(lines(), start_line, total)
+
+    def read_bytes(self, file_path: str, offset: int, length: int | None = None) -> str:
+        """Window of the file from byte `offset`, for files with very long lines (e.g. minified JSON)."""
+        size = self._check(file_path)
+        length = min(length or MAX_WINDOW_CHARS, MAX_WINDOW_CHARS)
+        if size == 0:
+            # mmap can't map an empty file
+            raise FileReaderError(f"{file_path} is empty.")
+        if offset < 0 or offset >= size:
+            raise FileReaderError(f"The offset must be between 0 and {size - 1}.")
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = mm[offset:offset + length].decode("utf-8", errors="replace")
+        end = min(offset + length, size)
+        header = f"Bytes {offset}-{end} of {size}"
+        if end < size:
+            header += f" (continue with offset={end})"
+        return f"{header}\n{text}"
+
+    # --- Outlines ---
+
+    def outline(self, file_path: str) -> str:
+        """Structure of the file: definitions for Python, schema and sample rows for csv/json, headings for text."""
+        extension = os.path.splitext(file_path)[1].lower()
+        self._check(file_path)
+        builder = {
+            ".pdf": self._pdf_outline,
+            ".py": self._python_outline,
+            ".csv": self._csv_outline,
+            ".tsv": self._csv_outline,
+            ".json": self._json_outline,
+            ".jsonl": self._jsonl_outline,
+            ".ndjson": self._jsonl_outline,
+        }.get(extension, self._text_outline)
+        return self._cached("outline", file_path, builder)
+
+    def _header(self, file_path: str, kind: str) -> str:
+        return f"{kind} file {os.path.basename(file_path)}, {self.line_count(file_path)} lines, {_format_size(os.path.getsize(file_path))}"
+
+    def _head_text(self, file_path: str, max_bytes: int = 256 * 1024) -> str:
+        with open(file_path, "rb") as f:
+            data = f.read(max_bytes)
+        text = data.decode("utf-8", errors="replace")
+        # Drop the last, possibly cut, line
+        return text.rsplit("\n", 1)[0] if len(data) == max_bytes and "\n" in text else text
+
+    def _python_outline(self, file_path: str) -> str:
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            source = f.read()
+        lines = [self._header(file_path, "Python")]
+        try:
+            tree = ast.parse(source)
+        except SyntaxError as e:
+            lines.append(f"Syntax error at line {e.lineno}: {e.msg}; definitions found by pattern:")
+            for number, line in enumerate(source.splitlines(), 1):
+                if re.match(r"\s*(async\s+def|def|class)\s", line):
+                    lines.append(f"  line {number}: {line.strip()[:120]}")
+            return "\n".join(lines[:MAX_OUTLINE_ENTRIES])
+
+        imports = []
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                imports.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                imports.append(node.module or ".")
+        if imports:
+            lines.append(f"imports: {', '.join(dict.fromkeys(imports))}")
+
+        def visit(nodes, indent: str):
+            for node in nodes:
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    if isinstance(node, ast.ClassDef):
+                        signature = f"class {node.name}" + (f"({', '.join(ast.unparse(base) for base in node.bases)})" if node.bases else "")
+                    else:
+                        prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+                        signature = f"{prefix} {node.name}({ast.unparse(node.args)})"
+                    docstring = (ast.get_docstring(node) or "").strip().split("\n")[0]
+                    lines.append(f"{indent}{signature}  [lines {node.lineno}-{node.end_lineno}]" + (f"  # {docstring[:80]}" if docstring else ""))
+                    visit(node.body, indent + "    ")
+                elif indent == "" and isinstance(node, ast.If) and "__main__" in ast.unparse(node.test):
+                    lines.append(f"if __name__ == '__main__':  [lines {node.lineno}-{node.end_lineno}]")
+
+        visit(tree.body, "")
+        if len(lines) > MAX_OUTLINE_ENTRIES:
+            lines = lines[:MAX_OUTLINE_ENTRIES] + [f"... {len(lines) - MAX_OUTLINE_ENTRIES} more definitions"]
+        return "\n".join(lines)
+
+    def _csv_outline(self, file_path: str) -> str:
+        head = self._head_text(file_path)
+        try:
+            dialect = csv.Sniffer().sniff(head[:64 * 1024], delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel_tab if file_path.lower().endswith(".tsv") else csv.excel
+        rows = list(csv.reader(io.StringIO(head), dialect))
+        if not rows:
+            return self._header(file_path, "Empty csv")
+        header, records = rows[0], rows[1:101]
+        lines = [self._header(file_path, "csv") + f", about {max(self.line_count(file_path) - 1, 0)} rows, "
+                 f"{len(header)} columns, delimiter {dialect.delimiter!r}"]
+        for index, column in enumerate(header):
+            values = [row[index].strip() for row in records if index < len(row) and row[index].strip()]
+            types = {_value_type(value) for value in values}
+            column_type = types.pop() if len(types) == 1 else ("float" if types == {"int", "float"} else "str" if types else "empty")
+            lines.append(f"  - {column!r} ({column_type})" + (f", e.g. {_short(values[0], 40)!r}" if values else ""))
+        lines.append("First rows:")
+        lines.extend("  " + dialect.delimiter.join(row) for row in rows[:SAMPLE_ROWS + 1])
+        return "\n".join(lines)
+
+    def _json_outline(self, file_path: str) -> str:
+        size = os.path.getsize(file_path)
+        if size > MAX_JSON_PARSE_BYTES:
+            return f"{self._header(file_path, 'JSON')}\nToo large to outline, read it by windows of lines or bytes."
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                if "Extra data" in str(e):
+                    return self._jsonl_outline(file_path)
+                return f"{self._header(file_path, 'JSON')}\nInvalid JSON at line {e.lineno}: {e.msg}"
+        lines = [self._header(file_path, "JSON"), f"schema: {_json_schema(data)}"]
+        records = data if isinstance(data, list) else None
+        if isinstance(data, dict):
+            # e.g. {"results": [...]}: the sample is taken from the first list
+            records = next((value for value in data.values() if isinstance(value, list)), None)
+            lines.append("top-level keys: " + ", ".join(f"{key} ({_json_schema(value, max_depth=1)})" for key, value in list(data.items())[:50]))
+        if records:
+            lines.append("First items:")
+            lines.extend(f"  {_short(item, 300)}" for item in records[:SAMPLE_ROWS])
+        return "\n".join(lines)
+
+    def _jsonl_outline(self, file_path: str) -> str:
+        records = []
+        for line in self._head_text(file_path).splitlines():
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+            if len(records) >= 100:
+                break
+        lines = [self._header(file_path, "JSON lines")]
+        if records:
+            keys = {}
+            for record in records:
+                if isinstance(record, dict):
+                    for key, value in record.items():
+                        keys.setdefault(key, _json_schema(value, max_depth=1))
+            lines.append("record schema: {" + ", ".join(f"{key}: {schema}" for key, schema in keys.items()) + "}" if keys else f"record schema: {_json_schema(records[0])}")
+            lines.append("First records:")
+            lines.extend(f"  {_short(record, 300)}" for record in records[:SAMPLE_ROWS])
+        return "\n".join(lines)
+
+    def _text_outline(self, file_path: str) -> str:
+        lines = [self._header(file_path, "Text")]
+        headings = []
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            for number, line in enumerate(f, 1):
+                if re.match(r"#{1,6}\s+\S|[A-Z][A-Z0-9 ,.'-]{3,60}$", line.rstrip()):
+                    headings.append(f"  line {number}: {line.strip()[:100]}")
+                    if len(headings) >= MAX_OUTLINE_ENTRIES:
+                        break
+        if headings:
+            lines.append("Headings:")
+            lines.extend(headings)
+        else:
+            lines.append("First lines:")
+            lines.extend(f"  {line[:200]}" for line in self._head_text(file_path, 4096).splitlines()[:SAMPLE_ROWS])
+        return "\n".join(lines)
+
+    def _pdf_outline(self, file_path: str) -> str:
+        text_lines = self._pdf_text(file_path).splitlines()
+        page_starts = [number for number, line in enumerate(text_lines, 1) if re.fullmatch(r"--- Page \d+ ---", line)]
+        lines = [f"pdf file {os.path.basename(file_path)}, {len(page_starts)} pages, {len(text_lines)} lines of text, "
+                 f"{_format_size(os.path.getsize(file_path))}"]
+        for page, start in enumerate(page_starts[:MAX_OUTLINE_ENTRIES], 1):
+            end = page_starts[page] - 1 if page < len(page_starts) else len(text_lines)
+            first_line = next((line.strip() for line in text_lines[start:end] if line.strip()), "(no text)")
+            lines.append(f"  page {page} (lines {start}-{end}): {first_line[:100]}")
+        return "\n".join(lines)
+
+
+# Shared by every agent of the pool, files with the same content are indexed once
+file_reader = FileReader()
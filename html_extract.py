@@ -0,0 +1,170 @@
+import math
+import re
+from collections import Counter
+from html.parser import HTMLParser
+
+from scheduler import estimate_tokens
+
+# Subtrees that never carry page content
+SKIPPED_TAGS = {"script", "style", "noscript", "nav", "footer", "header", "aside", "form", "svg", "iframe", "template", "button", "select"}
+# Tags that end a block of text
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "table", "tr", "br", "pre", "blockquote",
+              "h1", "h2", "h3", "h4", "h5", "h6", "dt", "dd", "figcaption", "caption", "hr"}
+HEADING_TAGS = {"h1": "#", "h2": "##", "h3": "###", "h4": "####", "h5": "#####", "h6": "######"}
+
+STOPWORDS = {"the", "a", "an", "of", "and", "or", "in", "on", "to", "is", "are", "was", "were", "for", "by", "with",
+             "what", "which", "who", "whom", "how", "when", "where", "that", "this", "it", "as", "at", "from", "be", "do", "does", "did"}
+
+
+def tokenize(text: str) -> list[str]:
+    return [word for word in re.findall(r"\w+", text.lower()) if word not in STOPWORDS]
+
+
+class ContentExtractor(HTMLParser):
+    """
+    Incremental HTML parser that keeps only the readable text of a page, as a list of blocks
+    (paragraphs, list items, table rows, headings). Navigation, scripts, styles, footers and
+    similar boilerplate subtrees are dropped while parsing, so the full DOM is never built.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._current = []
+        self._skip_depth = 0
+        self._heading = None
+        self._cell_separator = False
+
+    def _flush(self):
+        text = re.sub(r"\s+", " ", "".join(self._current)).strip()
+        self._current = []
+        if text:
+            self.blocks.append(f"{self._heading} {text}" if self._heading else text)
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_depth:
+            if tag in SKIPPED_TAGS:
+                self._skip_depth += 1
+            return
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = 1
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in HEADING_TAGS:
+            self._heading = HEADING_TAGS[tag]
+        elif tag in ("td", "th"):
+            if self._cell_separator:
+                self._current.append(" | ")
+            self._cell_separator = True
+
+    def handle_startendtag(self, tag, attrs):
+        if not self._skip_depth and tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if self._skip_depth:
+            if tag in SKIPPED_TAGS:
+                self._skip_depth -= 1
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in HEADING_TAGS:
+            self._heading = None
+        elif tag == "tr":
+            self._cell_separator = False
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._current.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_blocks(html_chunks) -> list[str]:
+    """Feeds an iterable of decoded HTML chunks to the extractor and returns the text blocks."""
+    parser = ContentExtractor()
+    for chunk in html_chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser.blocks
+
+
+def chunk_blocks(blocks: list[str], chunk_tokens: int = 200) -> list[str]:
+    """Groups consecutive blocks into chunks of roughly `chunk_tokens` tokens, splitting oversized blocks."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    max_chars = chunk_tokens * 4
+    for block in blocks:
+        pieces = [block[i:i + max_chars] for i in range(0, len(block), max_chars)] or [block]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > chunk_tokens:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def bm25_scores(chunks: list[str], query: str, k1: float = 1.5, b: float = 0.75) -> list[float]:
+    """Okapi BM25 score of every chunk against the query."""
+    query_terms = set(tokenize(query))
+    documents = [Counter(tokenize(chunk)) for chunk in chunks]
+    if not query_terms or not documents:
+        return [0.0] * len(chunks)
+    lengths = [sum(document.values()) for document in documents]
+    average_length = sum(lengths) / len(lengths) or 1.0
+    document_frequency = Counter(term for document in documents for term in query_terms if term in document)
+    scores = []
+    for document, length in zip(documents, lengths):
+        score = 0.0
+        for term in query_terms:
+            frequency = document.get(term, 0)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def select_chunks(chunks: list[str], query: str, token_budget: int = 2000, top_k: int = 8) -> list[str]:
+    """
+    Keeps the `top_k` chunks that rank best against the query and fit in the token budget,
+    returned in page order. Without a usable query the page is kept from the top.
+    """
+    scores = bm25_scores(chunks, query)
+    if any(scores):
+        ranked = sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)
+        ranked = [i for i in ranked if scores[i] > 0]
+    else:
+        ranked = list(range(len(chunks)))
+    selected = []
+    used_tokens = 0
+    for index in ranked:
+        if len(selected) == top_k:
+            break
+        chunk_tokens = estimate_tokens(chunks[index])
+        if used_tokens + chunk_tokens > token_budget:
+            continue
+        selected.append(index)
+        used_tokens += chunk_tokens
+    return [chunks[i] for i in sorted(selected)]
+
+
+def relevant_excerpt(blocks: list[str], query: str, token_budget: int = 2000, top_k: int = 8, chunk_tokens: int = 200) -> str:
+    """Chunks already extracted blocks and joins the ones selected for the query."""
+    chunks = chunk_blocks(blocks, chunk_tokens)
+    return "\n\n[...]\n\n".join(select_chunks(chunks, query, token_budget, top_k))
+
+
+def extract_relevant(html_chunks, query: str, token_budget: int = 2000, top_k: int = 8, chunk_tokens: int = 200) -> str:
+    """Streams HTML through the boilerplate filter and returns the query-relevant excerpt."""
+    return relevant_excerpt(extract_blocks(html_chunks), query, token_budget, top_k, chunk_tokens)
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from tracing import tracer
+
+DEFAULT_CACHE_DIR = os.getenv("WEB_CACHE_DIR", os.path.join(".cache", "web"))
+DEFAULT_TTL = float(os.getenv("WEB_CACHE_TTL", str(24 * 3600)))
+# Keys share a fixed set of locks instead of getting one each, which would grow with every URL
+KEY_LOCK_STRIPES = 64
+
+
+def content_hash(data: str | bytes) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+_file_digests = {}
+_file_digests_lock = threading.Lock()
+
+
+def file_digest(path: str) -> str:
+    """
+    sha256 of a file's content. The digest is remembered per (path, mtime, size), so repeated
+    calls on an unchanged file don't read it again.
+    """
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _file_digests_lock:
+        digest = _file_digests.get(signature)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    digest = hasher.hexdigest()
+    with _file_digests_lock:
+        _file_digests[signature] = digest
+    return digest
+
+
+class ResponseCache:
+    """
+    Two-level (memory LRU + on-disk JSON files) cache for fetched pages, converted markdown
+    and search results.
+
+    Entries expire after their TTL. Expired pages that carried an ETag or Last-Modified header
+    are revalidated with a conditional GET instead of being downloaded again. Hit/miss counters
+    and the fetch time saved by hits are available through `stats()`.
+    """
+
+    def __init__(self, cache_dir: str | None = DEFAULT_CACHE_DIR, max_entries: int = 256,
+                 max_disk_entries: int = 4096, default_ttl: float = DEFAULT_TTL):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.default_ttl = default_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = [threading.RLock() for _ in range(KEY_LOCK_STRIPES)]
+        self._writes_since_prune = 0
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0, "seconds_saved": 0.0}
+
+    # --- storage ---
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, content_hash(key) + ".json")
+
+    def _load(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("key") != key:
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: dict):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _store(self, key: str, entry: dict):
+        entry["key"] = key
+        self._remember(key, entry)
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            # Created on the first write: importing the module doesn't touch the disk
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing web cache entry: {e}")
+            return
+        with self._lock:
+            self._writes_since_prune += 1
+            should_prune = self._writes_since_prune >= 64
+            if should_prune:
+                self._writes_since_prune = 0
+        if should_prune:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Drops the least recently written files once the disk cache exceeds its entry bound."""
+        try:
+            files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+            if len(files) <= self.max_disk_entries:
+                return
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - self.max_disk_entries]:
+                os.remove(path)
+        except OSError as e:
+            print(f"Error pruning web cache: {e}")
+
+    def _key_lock(self, key: str):
+        # Concurrent agents asking for the same page fetch it only once; unrelated keys rarely
+        # share a lock, and it is reentrant in case a compute function uses the cache itself
+        return self._key_locks[hash(key) % len(self._key_locks)]
+
+    def _count(self, name: str, value: float = 1):
+        with self._lock:
+            self._stats[name] += value
+        if name != "seconds_saved":
+            # Lets the span of the calling tool report whether it was served from the cache
+            tracer.annotate(**{f"cache_{name}": value})
+
+    @staticmethod
+    def _is_fresh(entry: dict) -> bool:
+        return time.time() - entry["stored_at"] < entry["ttl"]
+
+    # --- public API ---
+
+    def get_or_compute(self, namespace: str, key: str, compute, ttl: float | None = None):
+        """Returns the cached value for (namespace, key) or stores and returns `compute()`."""
+        full_key = f"{namespace}:{key}"
+        with self._key_lock(full_key):
+            entry = self._load(full_key)
+            if entry is not None and self._is_fresh(entry):
+                self._count("hits")
+                self._count("seconds_saved", entry.get("compute_seconds", 0.0))
+                return entry["value"]
+            self._count("misses")
+            start = time.perf_counter()
+            value = compute()
+            self._store(full_key, {
+                "value": value,
+                "stored_at": time.time(),
+                "ttl": self.default_ttl if ttl is None else ttl,
+                "compute_seconds": time.perf_counter() - start,
+            })
+            return value
+
+    def fetch_text(self, url: str, fetch, ttl: float | None = None) -> str:
+        """
+        Returns the body of `url`, using the cache and HTTP revalidation.
+
+        `fetch(url, headers)` must perform the GET and return a requests-like response
+        (`status_code`, `headers`, `text`, `raise_for_status()`).
+        """
+        full_key = f"page:{url}"
+        with self._key_lock(full_key):
+            entry = self._load(full_key)
+            if entry is not None and self._is_fresh(entry):
+                self._count("hits")
+                self._count("seconds_saved", entry.get("compute_seconds", 0.0))
+                return entry["value"]
+
+            headers = {}
+            if entry is not None:
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+            start = time.perf_counter()
+            response = fetch(url, headers)
+            elapsed = time.perf_counter() - start
+            if entry is not None and headers and response.status_code == 304:
+                self._count("revalidated")
+                entry["stored_at"] = time.time()
+                self._store(full_key, entry)
+                return entry["value"]
+
+            self._count("misses")
+            response.raise_for_status()
+            text = response.text
+            self._store(full_key, {
+                "value": text,
+                "stored_at": time.time(),
+                "ttl": self.default_ttl if ttl is None else ttl,
+                "compute_seconds": elapsed,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            })
+            return text
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"] + stats["revalidated"]
+        stats["hit_rate"] = (stats["hits"] + stats["revalidated"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+
+# Shared by visit_webpage and the web search tool across agents, steps and questions
+web_cache = ResponseCache()
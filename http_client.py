@@ -0,0 +1,220 @@
+import codecs
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tracing import tracer
+
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+DEFAULT_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+DEFAULT_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+DEFAULT_MAX_BODY_BYTES = int(os.getenv("HTTP_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ResponseTooLargeError(requests.RequestException):
+    """Raised when a streamed body goes over the configured size cap."""
+
+
+def _connect_failed(error: requests.RequestException) -> bool:
+    """True when the connection could not be established, so the request was never sent."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.Timeout):
+        return False
+    from urllib3.exceptions import NewConnectionError
+
+    # requests wraps urllib3's MaxRetryError, whose reason is the underlying error; a reset or
+    # an aborted connection once the request was sent is a ProtocolError instead
+    reason = error.args[0] if error.args else None
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+
+
+class BoundedResponse:
+    """The parts of a requests.Response that callers use, with a body read under a size cap."""
+
+    def __init__(self, response: requests.Response, content: bytes, truncated: bool):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = response.url
+        self.content = content
+        self.truncated = truncated
+
+    @property
+    def text(self) -> str:
+        encoding = self._response.encoding or "utf-8"
+        try:
+            return self.content.decode(encoding, errors="replace")
+        except LookupError:
+            return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        import json
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        self._response.raise_for_status()
+
+
+class HttpClient:
+    """
+    Shared HTTP client: one pooled keep-alive session per host, connect/read timeouts on every
+    call, retries with jittered exponential backoff on transient errors, and streaming reads
+    that never hold more than `max_body_bytes` of a body in memory.
+    """
+
+    def __init__(self, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES, backoff_base: float = 0.5, backoff_max: float = 20.0,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES, pool_maxsize: int = 16):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_body_bytes = max_body_bytes
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def _backoff(self, attempt: int, response: requests.Response | None = None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.backoff_max, float(retry_after))
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def request(self, method: str, url: str, retries: int | None = None, **kwargs) -> requests.Response:
+        """
+        Sends a request with the default timeouts and retries transient failures.
+        Non-idempotent methods are only retried when the connection could not be established,
+        never on an error status: a POST that reached the server is not sent twice.
+        """
+        method = method.upper()
+        retries = self.max_retries if retries is None else retries
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session_for(url)
+        for attempt in range(retries + 1):
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == retries or (method not in IDEMPOTENT_METHODS and not _connect_failed(e)):
+                    raise
+                delay = self._backoff(attempt)
+                print(f"{method} {url} failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            if response.status_code in RETRY_STATUSES and method in IDEMPOTENT_METHODS and attempt < retries:
+                delay = self._backoff(attempt, response)
+                print(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+                response.close()
+                time.sleep(delay)
+                continue
+            return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get_bounded(self, url: str, max_bytes: int | None = None, truncate: bool = False, **kwargs) -> BoundedResponse:
+        """
+        Streams a GET response and stops reading after `max_bytes`. The body is cut at the cap
+        when `truncate` is True, otherwise ResponseTooLargeError is raised.
+        """
+        max_bytes = self.max_body_bytes if max_bytes is None else max_bytes
+        response = self.get(url, stream=True, **kwargs)
+        with response:
+            declared_length = response.headers.get("Content-Length")
+            if not truncate and declared_length and declared_length.isdigit() and int(declared_length) > max_bytes:
+                raise ResponseTooLargeError(f"Response from {url} is {declared_length} bytes, over the {max_bytes} bytes limit")
+            chunks = []
+            size = 0
+            truncated = False
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > max_bytes:
+                    if not truncate:
+                        raise ResponseTooLargeError(f"Response from {url} is over the {max_bytes} bytes limit")
+                    chunks.append(chunk[:len(chunk) - (size - max_bytes)])
+                    truncated = True
+                    break
+                chunks.append(chunk)
+        tracer.annotate(bytes=min(size, max_bytes), requests=1)
+        return BoundedResponse(response, b"".join(chunks), truncated)
+
+    def iter_text(self, url: str, max_bytes: int | None = None, chunk_size: int = 64 * 1024, **kwargs):
+        """
+        Yields the decoded body of a GET response chunk by chunk, silently stopping at `max_bytes`.
+        Lets parsers consume a page incrementally instead of holding the whole body.
+        """
+        max_bytes = self.max_body_bytes if max_bytes is None else max_bytes
+        response = self.get(url, stream=True, **kwargs)
+        with response:
+            response.raise_for_status()
+            try:
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            tracer.annotate(requests=1)
+            size = 0
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                size += len(chunk)
+                tracer.annotate(bytes=len(chunk))
+                if size > max_bytes:
+                    yield decoder.decode(chunk[:len(chunk) - (size - max_bytes)], final=True)
+                    return
+                yield decoder.decode(chunk)
+            yield decoder.decode(b"", final=True)
+
+    def download(self, url: str, path: str, max_bytes: int | None = None, chunk_size: int = 1024 * 1024,
+                 hasher=None, **kwargs) -> int:
+        """
+        Streams `url` into `path` and returns the number of bytes written. The file is written
+        next to its destination and renamed at the end, so a failed download leaves nothing behind.
+        When a hashlib object is passed as `hasher` it is updated with every chunk.
+        """
+        response = self.get(url, stream=True, **kwargs)
+        tmp_path = f"{path}.{threading.get_ident()}.part"
+        written = 0
+        with response:
+            response.raise_for_status()
+            try:
+                with open(tmp_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        written += len(chunk)
+                        if max_bytes is not None and written > max_bytes:
+                            raise ResponseTooLargeError(f"Download from {url} is over the {max_bytes} bytes limit")
+                        f.write(chunk)
+                        if hasher is not None:
+                            hasher.update(chunk)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        tracer.annotate(bytes=written, requests=1)
+        return written
+
+
+# Shared by the scoring API calls, attachment downloads and visit_webpage
+http_client = HttpClient()
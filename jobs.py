@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Evaluations share the agent pool and the Gemini quota, so by default they run one at a time
+DEFAULT_MAX_RUNNING_JOBS = int(os.getenv("EVALUATION_JOBS", "1"))
+
+
+class Job:
+    """
+    A background evaluation run. The worker records progress and results on it; any number of
+    watchers (e.g. a browser tab, or the same user after reconnecting) follow it with `wait`.
+    """
+
+    def __init__(self, owner: str):
+        self.id = uuid.uuid4().hex[:8]
+        self.owner = owner
+        self.status = "queued"
+        self.message = "Waiting for a free evaluation slot..."
+        self.total = 0
+        self.completed = 0
+        self.reused = 0
+        self.results = {}
+        self.outcome = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._version = 0
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    @property
+    def version(self) -> int:
+        """Incremented on every change, see `wait`."""
+        return self._version
+
+    def _changed(self):
+        self._version += 1
+        self._condition.notify_all()
+
+    def update(self, message: str | None = None, total: int | None = None, status: str | None = None):
+        with self._condition:
+            if message is not None:
+                self.message = message
+            if total is not None:
+                self.total = total
+            if status is not None:
+                self.status = status
+                if status == "running":
+                    self.started_at = time.time()
+                elif status in ("done", "failed"):
+                    self.finished_at = time.time()
+            self._changed()
+
+    def add_result(self, key, result, reused: bool = False):
+        """Records the result of one item; `reused` results (e.g. cached answers) don't count for the ETA."""
+        with self._condition:
+            self.results[key] = result
+            self.completed += 1
+            self.reused += int(reused)
+            self._changed()
+
+    def finish(self, outcome=None, message: str | None = None, failed: bool = False):
+        with self._condition:
+            self.outcome = outcome
+            self.update(message=message, status="failed" if failed else "done")
+
+    def wait(self, version: int, timeout: float = 1.0) -> int:
+        """Blocks until the job changes after `version` (or `timeout`), returns the new version."""
+        with self._condition:
+            if self._version == version and not self.finished:
+                self._condition.wait(timeout)
+            return self._version
+
+    def eta(self) -> float | None:
+        """Seconds left, extrapolated from the items computed so far."""
+        computed = self.completed - self.reused
+        if self.status != "running" or computed <= 0 or self.started_at is None:
+            return None
+        return (time.time() - self.started_at) / computed * (self.total - self.completed)
+
+    def progress_text(self) -> str:
+        text = f"Job {self.id} ({self.status}): {self.message}"
+        if self.total:
+            text += f"\n{self.completed}/{self.total} questions answered"
+            if self.reused:
+                text += f" ({self.reused} from the answer cache)"
+        eta = self.eta()
+        if eta is not None:
+            text += f", about {eta / 60:.1f} min left"
+        if self.finished and self.started_at:
+            text += f"\nFinished in {(self.finished_at - self.started_at) / 60:.1f} min"
+        return text
+
+
+class JobManager:
+    """Runs jobs on a small pool of background threads; extra jobs wait in its queue."""
+
+    def __init__(self, max_running: int = DEFAULT_MAX_RUNNING_JOBS):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_running), thread_name_prefix="evaluation-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, owner: str) -> Job:
+        """Queues `fn(job)`, returns the job right away."""
+        job = Job(owner)
+        with self._lock:
+            self._jobs[job.id] = job
+
+        def run():
+            job.update(status="running", message="Running...")
+            try:
+                fn(job)
+            except Exception as e:
+                print(f"Job {job.id} failed: {e}")
+                job.finish(message=f"Failed: {e}", failed=True)
+                return
+            if not job.finished:
+                job.finish()
+
+        self._executor.submit(run)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_job(self, owner: str) -> Job | None:
+        """The owner's queued or running job, if any, so a reconnecting user follows it instead of starting another."""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.owner == owner and not job.finished]
+        return max(jobs, key=lambda job: job.created_at) if jobs else None
+
+    def latest_job(self, owner: str) -> Job | None:
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.owner == owner]
+        return max(jobs, key=lambda job: job.created_at) if jobs else None
+
+    def queue_position(self, job: Job) -> int:
+        """Number of jobs queued before `job`."""
+        with self._lock:
+            return sum(1 for other in self._jobs.values() if other.status == "queued" and other.created_at < job.created_at)
@@ -0,0 +1,156 @@
+import asyncio
+import base64
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from http_cache import ResponseCache, content_hash, file_digest
+from scheduler import rate_limited_completion
+
+DEFAULT_MEDIA_MODEL = "gemini/gemini-2.0-flash-lite"
+DEFAULT_MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", os.path.join(".cache", "media"))
+
+IMAGE_PROMPT = "Describe the image in detail."
+AUDIO_PROMPT = "Please transcribe the content of this audio."
+MEDIA_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp3", ".wav", ".m4a", ".flac", ".ogg"}
+
+
+def guess_mime_type(path: str) -> str:
+    mime_type, _ = mimetypes.guess_type(path)
+    return mime_type or "application/octet-stream"
+
+
+def default_prompt(path: str) -> str:
+    return AUDIO_PROMPT if guess_mime_type(path).startswith("audio/") else IMAGE_PROMPT
+
+
+class LiteLLMMediaBackend:
+    """Sends the file inline (base64 data URL) to a multimodal model through the rate limiter."""
+
+    def __init__(self, model: str = DEFAULT_MEDIA_MODEL):
+        self.model = model
+        self.name = f"litellm:{model}"
+
+    def describe(self, data: bytes, mime_type: str, prompt: str) -> str:
+        encoded_data = base64.b64encode(data).decode("utf-8")
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "file",
+                        "file": {
+                            "file_data": f"data:{mime_type};base64,{encoded_data}",  # 👈 SET MIME_TYPE + DATA
+                        }
+                    },
+                ],
+            }
+        ]
+        response = rate_limited_completion(model=self.model, messages=messages)
+        return response.get('choices', [{}])[0].get('message', {}).get('content')
+
+
+class MockMediaBackend:
+    """Offline backend for tests and benchmarks: answers deterministically, optionally after a delay."""
+
+    name = "mock"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def describe(self, data: bytes, mime_type: str, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return f"[mock] {prompt} ({mime_type}, {len(data)} bytes, sha256 {content_hash(data)[:12]})"
+
+
+class MediaAnalyzer:
+    """
+    Describes images and transcribes audio through a pluggable backend.
+
+    Results are cached (memory LRU + disk) by file content hash, prompt and backend, so asking
+    twice about the same attachment never calls the model again. Several files can be
+    dispatched concurrently with `analyze_many`, and async variants are provided for asyncio runners.
+    """
+
+    def __init__(self, backend=None, cache_dir: str | None = DEFAULT_MEDIA_CACHE_DIR, max_workers: int = 4):
+        self.backend = backend or LiteLLMMediaBackend()
+        self.cache = ResponseCache(cache_dir=cache_dir, max_entries=512, default_ttl=float("inf"))
+        self.max_workers = max_workers
+
+    def cache_key(self, path: str, prompt: str, mime_type: str | None = None) -> str:
+        return f"{self.backend.name}:{file_digest(path)}:{mime_type or ''}:{content_hash(prompt)[:16]}"
+
+    def analyze(self, path: str, prompt: str | None = None, mime_type: str | None = None) -> str:
+        prompt = prompt or default_prompt(path)
+        mime_type = mime_type or guess_mime_type(path)
+        return self.cache.get_or_compute(
+            "media",
+            self.cache_key(path, prompt, mime_type),
+            lambda: self.backend.describe(Path(path).read_bytes(), mime_type, prompt),
+        )
+
+    def analyze_bytes(self, data: bytes, mime_type: str, prompt: str) -> str:
+        """Same as `analyze` for in-memory content (e.g. one chunk of a longer recording)."""
+        return self.cache.get_or_compute(
+            "media",
+            f"{self.backend.name}:{content_hash(data)}:{mime_type}:{content_hash(prompt)[:16]}",
+            lambda: self.backend.describe(data, mime_type, prompt),
+        )
+
+    def analyze_many(self, paths: list[str], prompt: str | None = None) -> list[str]:
+        """Analyzes several files concurrently, results are returned in the order of `paths`."""
+        if not paths:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(paths))) as executor:
+            return list(executor.map(lambda path: self.analyze(path, prompt), paths))
+
+    async def aanalyze(self, path: str, prompt: str | None = None, mime_type: str | None = None) -> str:
+        return await asyncio.to_thread(self.analyze, path, prompt, mime_type)
+
+    async def aanalyze_many(self, paths: list[str], prompt: str | None = None) -> list[str]:
+        return list(await asyncio.gather(*(self.aanalyze(path, prompt) for path in paths)))
+
+    def prewarm(self, path_futures, analyze_fn=None) -> threading.Thread:
+        """
+        Analyzes, in the background, the media files among downloads that are still in progress
+        (futures of local paths), so the agents' describe_* calls are served from the cache.
+        `analyze_fn(path)` defaults to `analyze` with the default prompt for the file type.
+        """
+        analyze_fn = analyze_fn or self.analyze
+
+        def analyze_quietly(path):
+            try:
+                analyze_fn(path)
+            except Exception as e:
+                print(f"Error pre-analyzing {path}: {e}")
+
+        def run():
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for future in as_completed(path_futures):
+                    try:
+                        path = future.result()
+                    except Exception:
+                        continue
+                    if path and os.path.splitext(path)[1].lower() in MEDIA_EXTENSIONS:
+                        executor.submit(analyze_quietly, path)
+
+        thread = threading.Thread(target=run, name="media-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+
+def _default_backend():
+    # MEDIA_BACKEND=mock runs the media tools offline
+    return MockMediaBackend() if os.getenv("MEDIA_BACKEND") == "mock" else LiteLLMMediaBackend()
+
+
+media_analyzer = MediaAnalyzer(backend=_default_backend())
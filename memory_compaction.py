@@ -0,0 +1,111 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from scheduler import estimate_tokens
+from tracing import tracer
+
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "6000"))
+COMPACT_OBSERVATION_TOKENS = 200
+KEEP_RECENT_STEPS = 1
+
+
+class OutputStore:
+    """Full text of the tool outputs removed from the agents' memory, retrievable by reference."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._outputs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        ref = f"out-{uuid.uuid4().hex[:10]}"
+        with self._lock:
+            self._outputs[ref] = text
+            while len(self._outputs) > self.max_entries:
+                self._outputs.popitem(last=False)
+        return ref
+
+    def get(self, ref: str) -> str | None:
+        with self._lock:
+            return self._outputs.get(ref)
+
+
+# Shared by every agent of the pool: references are unique, so they never collide
+output_store = OutputStore()
+
+
+def step_tokens(step) -> int:
+    """Estimated prompt tokens a memory step adds to every following LLM call."""
+    text = ""
+    for attribute in ("task", "plan", "model_output", "observations"):
+        value = getattr(step, attribute, None)
+        if isinstance(value, str):
+            text += value
+    error = getattr(step, "error", None)
+    if error is not None:
+        text += str(error)
+    return estimate_tokens(text) if text else 0
+
+
+def compact_text(text: str, ref: str, keep_tokens: int = COMPACT_OBSERVATION_TOKENS) -> str:
+    """Beginning and end of `text` around a note telling the agent how to read the full output."""
+    head_chars, tail_chars = keep_tokens * 3, keep_tokens  # ~4 characters per token
+    removed = estimate_tokens(text[head_chars:len(text) - tail_chars])
+    return (
+        f"{text[:head_chars]}\n"
+        f"[... {removed} tokens of this output were removed from memory to save context. "
+        f"Call recall_output(ref=\"{ref}\") to read it in full ...]\n"
+        f"{text[-tail_chars:]}"
+    )
+
+
+class MemoryCompactor:
+    """
+    smolagents step callback keeping an agent's memory under a token budget.
+
+    After every action step, if the steps in memory are estimated above `token_budget`, the
+    observations of the older steps (all but the last `keep_recent` ones) are cut to their
+    beginning and end, and the full text is moved to `output_store` where the `recall_output`
+    tool can read it. The prompt of each step then stays roughly flat instead of growing with
+    every web page the agent has read.
+    """
+
+    def __init__(self, token_budget: int = MEMORY_TOKEN_BUDGET, keep_recent: int = KEEP_RECENT_STEPS,
+                 compact_tokens: int = COMPACT_OBSERVATION_TOKENS, store: OutputStore | None = None):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.compact_tokens = compact_tokens
+        self.store = store or output_store
+
+    def compact(self, steps) -> tuple[int, int]:
+        """Compacts `steps` in place, returns (tokens saved, tokens left in memory)."""
+        total = sum(step_tokens(step) for step in steps)
+        if total <= self.token_budget:
+            return 0, total
+        saved = 0
+        action_steps = [step for step in steps if hasattr(step, "observations")]
+        for step in action_steps[:max(0, len(action_steps) - self.keep_recent)]:
+            observations = step.observations
+            if not observations or estimate_tokens(observations) <= self.compact_tokens * 2:
+                continue
+            before = step_tokens(step)
+            step.observations = compact_text(observations, self.store.put(observations), self.compact_tokens)
+            saved += before - step_tokens(step)
+            if total - saved <= self.token_budget:
+                break
+        return saved, total - saved
+
+    def __call__(self, memory_step, agent=None):
+        if agent is None:
+            return
+        steps = list(agent.memory.steps)
+        # smolagents runs the callbacks before appending the step to the memory
+        if memory_step not in steps:
+            steps.append(memory_step)
+        saved, remaining = self.compact(steps)
+        if saved:
+            tracer.annotate(compaction_tokens_saved=saved)
+            print(f"Compacted memory of {getattr(agent, 'name', None) or 'manager'} after step "
+                  f"{getattr(memory_step, 'step_number', '?')}: {saved} tokens saved, ~{remaining} tokens left")
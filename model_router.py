@@ -0,0 +1,75 @@
+import os
+import re
+import threading
+from collections import defaultdict
+
+FAST_MODEL = os.getenv("FAST_MODEL", "gemini/gemini-2.0-flash-lite")
+STRONG_MODEL = os.getenv("STRONG_MODEL", "gemini/gemini-2.0-flash")
+# Set MODEL_ROUTING=0 to send every question to the strong model
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "1") not in ("0", "false", "False", "")
+# Longer questions usually chain several lookups, they go straight to the strong model
+FAST_MAX_WORDS = int(os.getenv("FAST_MAX_WORDS", "60"))
+
+# Questions the fast model rarely gets right: videos, games, puzzles and multi-hop lookups
+STRONG_PATTERNS = {
+    "video": re.compile(r"youtube\.com|youtu\.be|\bvideo\b", re.IGNORECASE),
+    "game": re.compile(r"\bchess\b|\bgo board\b|\bsudoku\b", re.IGNORECASE),
+    "reversed text": re.compile(r"\b(rewsna|etirw|ecnetnes)\b", re.IGNORECASE),
+    "multi-hop": re.compile(
+        r"\b(and then|whose|which of (these|the following)|cross-reference|according to .+ (who|which|what))\b",
+        re.IGNORECASE,
+    ),
+}
+
+
+def route_question(question: str) -> tuple[str, str]:
+    """
+    Picks the tier to start with from cheap heuristics on the question text: returns
+    ("fast" | "strong", route) where `route` names the rule that decided, for the stats.
+    """
+    if not MODEL_ROUTING:
+        return "strong", "routing disabled"
+    for route, pattern in STRONG_PATTERNS.items():
+        if pattern.search(question):
+            return "strong", route
+    # The attachment path appended by the app is not part of the question
+    text = question.split(" The file path is: ")[0]
+    if len(text.split()) > FAST_MAX_WORDS:
+        return "strong", "long question"
+    extension = re.search(r"The file path is: .*?(\.\w+)\s*$", question)
+    return "fast", f"{extension.group(1).lower()} attachment" if extension else "short question"
+
+
+class RouterStats:
+    """Latency and success of every attempt, per tier and per route, to tune the routing rules from data."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers = defaultdict(lambda: {"attempts": 0, "accepted": 0, "seconds": 0.0})
+        self._routes = defaultdict(lambda: {"attempts": 0, "accepted": 0, "escalated": 0})
+
+    def record(self, tier: str, route: str, seconds: float, accepted: bool, escalated: bool = False):
+        with self._lock:
+            tier_stats = self._tiers[tier]
+            tier_stats["attempts"] += 1
+            tier_stats["accepted"] += int(accepted)
+            tier_stats["seconds"] += seconds
+            route_stats = self._routes[f"{tier}: {route}"]
+            route_stats["attempts"] += 1
+            route_stats["accepted"] += int(accepted)
+            route_stats["escalated"] += int(escalated)
+
+    def stats(self) -> dict:
+        with self._lock:
+            tiers = {
+                tier: {
+                    "attempts": values["attempts"],
+                    "success_rate": round(values["accepted"] / values["attempts"], 3),
+                    "avg_s": round(values["seconds"] / values["attempts"], 2),
+                }
+                for tier, values in self._tiers.items()
+            }
+            return {"tiers": tiers, "routes": {route: dict(values) for route, values in self._routes.items()}}
+
+
+router_stats = RouterStats()
@@ -0,0 +1,448 @@
+import ast
+import math
+import operator
+import re
+import statistics
+import time
+from decimal import Decimal, localcontext
+from fractions import Fraction
+from functools import lru_cache
+
+MAX_EXPRESSION_LENGTH = 2000
+# Integers (and numerators/denominators of exact fractions) are limited to about 3000 digits
+MAX_INT_BITS = 10000
+MAX_VECTOR_SIZE = 1_000_000
+# Element-wise operations on vectors run by chunks, checking the deadline in between
+VECTOR_CHUNK_SIZE = 65536
+# Longer vectors are shown with their first values and their length
+MAX_FORMATTED_ITEMS = 100
+DEFAULT_TIMEOUT = 1.0
+
+
+class CalculatorError(ValueError):
+    """Invalid, unsupported or too expensive expression."""
+
+
+def _numpy():
+    import numpy as np
+    return np
+
+
+def _is_numpy_scalar(value) -> bool:
+    """Results of numpy aggregates (np.float64...) and 0-d arrays: plain numbers, not vectors."""
+    return type(value).__module__ == "numpy" and getattr(value, "ndim", None) == 0
+
+
+def _is_array(value) -> bool:
+    return type(value).__module__ == "numpy" and getattr(value, "ndim", 0) > 0
+
+
+def _is_vector(value) -> bool:
+    return isinstance(value, list) or _is_array(value)
+
+
+def _exact(value):
+    """Numpy scalars are returned as Python numbers, fractions with a denominator of 1 as integers."""
+    if _is_numpy_scalar(value):
+        value = value.item()
+    if isinstance(value, Fraction) and value.denominator == 1:
+        return value.numerator
+    return value
+
+
+def _bits(value) -> int:
+    if isinstance(value, int):
+        return abs(value).bit_length()
+    if isinstance(value, Fraction):
+        return max(abs(value.numerator).bit_length(), value.denominator.bit_length())
+    return 0
+
+
+def _check_deadline(deadline: float):
+    if time.monotonic() > deadline:
+        raise CalculatorError("evaluation took too long")
+
+
+def _check_size(value):
+    if _bits(value) > MAX_INT_BITS:
+        raise CalculatorError("number too large")
+    if _is_array(value) and value.size > MAX_VECTOR_SIZE:
+        raise CalculatorError(f"vectors are limited to {MAX_VECTOR_SIZE} elements")
+    return value
+
+
+def _to_vector(value):
+    return _numpy().asarray([float(item) if isinstance(item, Fraction) else item for item in value])
+
+
+def _for_numpy(value):
+    if isinstance(value, list):
+        return _to_vector(value)
+    return float(value) if isinstance(value, Fraction) else value
+
+
+def _float_vector(value):
+    """Float array for the numpy functions, which don't accept arrays of Python integers."""
+    value = _for_numpy(value)
+    return value.astype(float) if _is_array(value) and value.dtype == object else value
+
+
+def _power(base, exponent):
+    if _is_array(base) or _is_array(exponent):
+        return _numpy().power(_for_numpy(base), _for_numpy(exponent))
+    exponent = _exact(exponent)
+    if isinstance(base, (int, Fraction)) and isinstance(exponent, int):
+        # Estimated before computing, so 9**9**9 fails immediately instead of hanging
+        magnitude = max(abs(base.numerator), base.denominator) if isinstance(base, Fraction) else abs(base)
+        if magnitude > 1 and abs(exponent) * math.log2(magnitude) > MAX_INT_BITS:
+            raise CalculatorError("result too large")
+        return Fraction(base) ** exponent if exponent < 0 else base ** exponent
+    base, exponent = float(base), float(exponent)
+    if base < 0 and not exponent.is_integer():
+        raise CalculatorError("negative number raised to a fractional power")
+    return math.pow(base, exponent)
+
+
+def _divide(left, right):
+    if _is_array(left) or _is_array(right):
+        return _numpy().true_divide(_for_numpy(left), _for_numpy(right))
+    if isinstance(left, (int, Fraction)) and isinstance(right, (int, Fraction)):
+        # Exact: 1/3 stays one third instead of 0.333...
+        return Fraction(left) / right
+    return left / right
+
+
+def _product(items):
+    # Estimated before computing, so prod(range(1, 10**6)) fails immediately
+    if sum(_bits(item) for item in items) > MAX_INT_BITS and 0 not in items:
+        raise CalculatorError("result too large")
+    return math.prod(items)
+
+
+def _multiply(left, right):
+    if _bits(left) + _bits(right) > MAX_INT_BITS:
+        raise CalculatorError("result too large")
+    return operator.mul(left, right)
+
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _multiply,
+    ast.Div: _divide,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _power,
+    # Calculator convention: 2^10 is a power, not a bitwise xor
+    ast.BitXor: _power,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+    "tau": math.tau,
+    "inf": math.inf,
+}
+
+
+def _elementwise(scalar_fn, numpy_name: str):
+    def apply(value, *args):
+        if _is_vector(value):
+            return getattr(_numpy(), numpy_name)(_float_vector(value), *args)
+        return scalar_fn(float(value) if isinstance(value, Fraction) else value, *args)
+    return apply
+
+
+def _aggregate(scalar_fn, numpy_name: str, exact_on_integers: bool = False):
+    """
+    sum(1, 2), sum([1, 2]) and sum(range(10)): exact on lists and integer arrays (numpy integers
+    overflow silently), numpy on float arrays.
+    """
+    def apply(*values):
+        items = values[0] if len(values) == 1 and _is_vector(values[0]) else list(values)
+        if _is_array(items):
+            if exact_on_integers and items.dtype.kind in "iuO":
+                if not items.size:
+                    raise CalculatorError(f"{numpy_name} of an empty list")
+                return scalar_fn(items.tolist())
+            return getattr(_numpy(), numpy_name)(_float_vector(items))
+        if not items:
+            raise CalculatorError(f"{numpy_name} of an empty list")
+        if any(_is_vector(item) for item in items):
+            return getattr(_numpy(), numpy_name)(_to_vector([_for_numpy(item) for item in items]))
+        return scalar_fn(items)
+    return apply
+
+
+def _log(value, base=None):
+    if _is_vector(value):
+        result = _numpy().log(_float_vector(value))
+        return result / math.log(float(base)) if base is not None else result
+    return math.log(float(value)) if base is None else math.log(float(value), float(base))
+
+
+def _integer_argument(value, limit: int = MAX_INT_BITS) -> int:
+    value = _exact(value)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if not isinstance(value, int) or value < 0:
+        raise CalculatorError("expected a non-negative integer")
+    if value > limit:
+        raise CalculatorError("argument too large")
+    return value
+
+
+def _round(value, digits=0):
+    if _is_vector(value):
+        return _numpy().round(_float_vector(value), int(digits))
+    return round(value, int(digits)) if digits else round(value)
+
+
+def _integer_or_float(value):
+    value = _exact(value)
+    return float(value) if isinstance(value, Fraction) else value
+
+
+def _range(*args):
+    if not 1 <= len(args) <= 3:
+        raise CalculatorError("range takes 1 to 3 arguments")
+    bounds = [_integer_or_float(arg) for arg in args]
+    start, stop, step = (0, bounds[0], 1) if len(bounds) == 1 else (bounds[0], bounds[1], bounds[2] if len(bounds) == 3 else 1)
+    if step == 0:
+        raise CalculatorError("range step must not be zero")
+    # Checked before allocating the array
+    if (stop - start) / step > MAX_VECTOR_SIZE:
+        raise CalculatorError(f"vectors are limited to {MAX_VECTOR_SIZE} elements")
+    return _numpy().arange(*bounds)
+
+
+FUNCTIONS = {
+    "abs": _elementwise(abs, "abs"),
+    "sqrt": _elementwise(math.sqrt, "sqrt"),
+    "cbrt": _elementwise(lambda value: math.copysign(abs(value) ** (1 / 3), value), "cbrt"),
+    "exp": _elementwise(math.exp, "exp"),
+    "log": _log,
+    "ln": _elementwise(math.log, "log"),
+    "log10": _elementwise(math.log10, "log10"),
+    "log2": _elementwise(math.log2, "log2"),
+    "sin": _elementwise(math.sin, "sin"),
+    "cos": _elementwise(math.cos, "cos"),
+    "tan": _elementwise(math.tan, "tan"),
+    "asin": _elementwise(math.asin, "arcsin"),
+    "acos": _elementwise(math.acos, "arccos"),
+    "atan": _elementwise(math.atan, "arctan"),
+    "sinh": _elementwise(math.sinh, "sinh"),
+    "cosh": _elementwise(math.cosh, "cosh"),
+    "tanh": _elementwise(math.tanh, "tanh"),
+    "degrees": _elementwise(math.degrees, "degrees"),
+    "radians": _elementwise(math.radians, "radians"),
+    "floor": _elementwise(math.floor, "floor"),
+    "ceil": _elementwise(math.ceil, "ceil"),
+    "round": _round,
+    "atan2": lambda y, x: math.atan2(float(y), float(x)),
+    "hypot": lambda *values: math.hypot(*(float(value) for value in values)),
+    "factorial": lambda n: math.factorial(_integer_argument(n, 1000)),
+    "comb": lambda n, k: math.comb(_integer_argument(n), _integer_argument(k)),
+    "perm": lambda n, k: math.perm(_integer_argument(n), _integer_argument(k)),
+    "gcd": lambda *values: math.gcd(*(_integer_argument(value) for value in values)),
+    "lcm": lambda *values: math.lcm(*(_integer_argument(value) for value in values)),
+    "sum": _aggregate(sum, "sum", exact_on_integers=True),
+    "prod": _aggregate(_product, "prod", exact_on_integers=True),
+    "min": _aggregate(min, "min", exact_on_integers=True),
+    "max": _aggregate(max, "max", exact_on_integers=True),
+    "mean": _aggregate(statistics.mean, "mean"),
+    "median": _aggregate(statistics.median, "median"),
+    "std": _aggregate(statistics.pstdev, "std"),
+    "var": _aggregate(statistics.pvariance, "var"),
+    "len": lambda value: len(value) if _is_vector(value) else 1,
+    "range": _range,
+}
+
+
+def _literal(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise CalculatorError(f"unsupported value {value!r}")
+    if isinstance(value, float) and math.isfinite(value):
+        # Decimal literals are exact: 0.1 + 0.2 == 0.3
+        return _exact(Fraction(repr(value)))
+    return value
+
+
+def _apply_vector(binary, left, right, deadline: float):
+    """
+    Element-wise operation by chunks. Integer results are checked against a float computation:
+    where int64 would overflow, the chunk is computed again on Python integers (object array).
+    """
+    np = _numpy()
+    left, right = np.broadcast_arrays(np.asarray(_for_numpy(left)), np.asarray(_for_numpy(right)))
+    if left.size > MAX_VECTOR_SIZE:
+        raise CalculatorError(f"vectors are limited to {MAX_VECTOR_SIZE} elements")
+    chunks = []
+    for start in range(0, max(left.size, 1), VECTOR_CHUNK_SIZE):
+        _check_deadline(deadline)
+        left_chunk, right_chunk = left[start:start + VECTOR_CHUNK_SIZE], right[start:start + VECTOR_CHUNK_SIZE]
+        chunk = binary(left_chunk, right_chunk)
+        if chunk.dtype.kind in "iuO":
+            with np.errstate(all="ignore"):
+                magnitude = np.abs(binary(left_chunk.astype(float), right_chunk.astype(float)))
+            if not np.all(np.isfinite(magnitude)):
+                raise CalculatorError("result too large")
+            if chunk.dtype != object and np.any(magnitude >= 2.0 ** 62):
+                chunk = binary(left_chunk.astype(object), right_chunk.astype(object))
+        chunks.append(chunk)
+    return np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def _apply_binary(binary, left, right, deadline: float):
+    if _is_array(left) or _is_array(right):
+        return _check_size(_apply_vector(binary, left, right, deadline))
+    if isinstance(left, list) or isinstance(right, list):
+        # Short literal lists are computed element by element, keeping exact arithmetic
+        if isinstance(left, list) and isinstance(right, list):
+            if len(left) != len(right):
+                raise CalculatorError(f"lists of different lengths ({len(left)} and {len(right)})")
+            return [_apply_binary(binary, a, b, deadline) for a, b in zip(left, right)]
+        if isinstance(left, list):
+            return [_apply_binary(binary, a, right, deadline) for a in left]
+        return [_apply_binary(binary, left, b, deadline) for b in right]
+    return _check_size(_exact(binary(left, right)))
+
+
+def _compile(node):
+    """Turns a validated AST node into a closure taking the evaluation deadline."""
+    if isinstance(node, ast.Expression):
+        if isinstance(node.body, ast.Tuple):
+            # '1,2' is ambiguous (thousands separator or two values): lists have to be bracketed
+            raise CalculatorError("write lists in brackets, e.g. [1, 2, 3], and numbers without thousands separators")
+        return _compile(node.body)
+    if isinstance(node, ast.Constant):
+        value = _check_size(_literal(node.value))
+        return lambda deadline: value
+    if isinstance(node, ast.Name):
+        if node.id not in CONSTANTS:
+            raise CalculatorError(f"unknown name '{node.id}'")
+        value = CONSTANTS[node.id]
+        return lambda deadline: value
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        unary, operand = UNARY_OPERATORS[type(node.op)], _compile(node.operand)
+        return lambda deadline: unary(operand(deadline))
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        binary, left, right = BINARY_OPERATORS[type(node.op)], _compile(node.left), _compile(node.right)
+
+        def evaluate_binary(deadline):
+            _check_deadline(deadline)
+            return _apply_binary(binary, left(deadline), right(deadline), deadline)
+        return evaluate_binary
+    if isinstance(node, (ast.List, ast.Tuple)):
+        if len(node.elts) > MAX_VECTOR_SIZE:
+            raise CalculatorError(f"vectors are limited to {MAX_VECTOR_SIZE} elements")
+        elements = [_compile(element) for element in node.elts]
+        # Kept as a list of exact numbers, converted to a numpy array only for element-wise operations
+        return lambda deadline: [element(deadline) for element in elements]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        if node.func.id not in FUNCTIONS:
+            raise CalculatorError(f"unknown function '{node.func.id}'")
+        function, arguments = FUNCTIONS[node.func.id], [_compile(argument) for argument in node.args]
+
+        def evaluate_call(deadline):
+            _check_deadline(deadline)
+            return _check_size(_exact(function(*(argument(deadline) for argument in arguments))))
+        return evaluate_call
+    raise CalculatorError(f"unsupported syntax '{ast.dump(node)[:60]}'")
+
+
+GROUPED_NUMBER_PATTERN = re.compile(r"(?<![\w.])\d{1,3}(?:,\d{3})+(?![\w,])")
+CURRENCY_PATTERN = re.compile(r"[$€£¥](?=\s*[\d.(])")
+# 15% is 15/100 when the % sign is attached to the number and followed by an operator; 10 % 3 is a modulo
+PERCENT_PATTERN = re.compile(r"(\d+(?:\.\d+)?)%(?=\s*(?:$|[-+*/^)\],]))")
+# 3 x 4 is a product (0x1F stays a hexadecimal literal)
+TIMES_PATTERN = re.compile(r"(?<=[\d)\]])(?<!\b0)\s*x\s*(?=[\d(\[])")
+
+
+def _strip_digit_groups(expression: str) -> str:
+    """Removes thousands separators, only outside brackets where commas separate arguments and list items."""
+    parts, depth, start = [], 0, 0
+    for index, char in enumerate(expression + "("):
+        if char in "([" and depth == 0:
+            parts.append(GROUPED_NUMBER_PATTERN.sub(lambda match: match.group().replace(",", ""), expression[start:index]))
+            start = index
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth = max(depth - 1, 0)
+            if depth == 0:
+                parts.append(expression[start:index + 1])
+                start = index + 1
+    return "".join(parts)
+
+
+def _normalize_expression(expression: str) -> str:
+    expression = expression.strip().rstrip("=").strip()
+    for symbol, replacement in (("×", "*"), ("÷", "/"), ("−", "-"), ("√", "sqrt"), ("π", "pi")):
+        expression = expression.replace(symbol, replacement)
+    expression = _strip_digit_groups(expression)
+    expression = CURRENCY_PATTERN.sub("", expression)
+    expression = PERCENT_PATTERN.sub(r"(\1/100)", expression)
+    return TIMES_PATTERN.sub(" * ", expression)
+
+
+@lru_cache(maxsize=512)
+def compile_expression(expression: str):
+    """Parses and validates an expression once; the compiled closures are cached by text."""
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalculatorError(f"expression longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(_normalize_expression(expression), mode="eval")
+    except SyntaxError as e:
+        raise CalculatorError(f"invalid expression ({e.msg})")
+    return _compile(tree)
+
+
+def format_result(value) -> str:
+    """Exact fractions are shown as decimals when they have a finite expansion, floats without noise."""
+    if _is_numpy_scalar(value):
+        value = value.item()
+    if _is_vector(value):
+        head = value[:MAX_FORMATTED_ITEMS]
+        items = [format_result(item) for item in (head.tolist() if _is_array(head) else head)]
+        if len(value) > MAX_FORMATTED_ITEMS:
+            items.append(f"... ({len(value)} values)")
+        return "[" + ", ".join(items) + "]"
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, Fraction):
+        denominator = value.denominator
+        for factor in (2, 5):
+            while denominator % factor == 0:
+                denominator //= factor
+        if denominator == 1:
+            # Finite decimal expansion: printed exactly
+            with localcontext() as context:
+                context.prec = len(str(abs(value.numerator))) + len(str(value.denominator)) + 2
+                return format(Decimal(value.numerator) / Decimal(value.denominator), "f")
+        return repr(float(value))
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return repr(value)
+    return str(value)
+
+
+def evaluate(expression: str, timeout: float = DEFAULT_TIMEOUT):
+    """Evaluates an arithmetic expression safely; raises CalculatorError on failure."""
+    compiled = compile_expression(expression)
+    try:
+        return compiled(time.monotonic() + timeout)
+    except CalculatorError:
+        raise
+    except ZeroDivisionError:
+        raise CalculatorError("division by zero")
+    except OverflowError:
+        raise CalculatorError("result too large")
+    except (ValueError, TypeError) as e:
+        raise CalculatorError(str(e) or "invalid operation")
@@ -0,0 +1,178 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tracing import tracer
+
+# Gemini free tier quotas for gemini-2.0-flash, override them through the environment
+DEFAULT_RPM = float(os.getenv("GEMINI_RPM", "15"))
+DEFAULT_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+# The fast model of the router (gemini-2.0-flash-lite) has its own, larger quota
+FAST_RPM = float(os.getenv("FAST_GEMINI_RPM", "30"))
+FAST_TPM = float(os.getenv("FAST_GEMINI_TPM", "1000000"))
+DEFAULT_CONCURRENCY = int(os.getenv("AGENT_CONCURRENCY", "4"))
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Returns True if the exception looks like a 429 / quota exhausted error."""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return (
+        "429" in message
+        or "rate limit" in message
+        or "ratelimit" in message
+        or "resource_exhausted" in message
+        or "too many requests" in message
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for a piece of text."""
+    return len(text) // 4 + 1
+
+
+def estimate_message_tokens(messages) -> int:
+    """Cheap token estimate (~4 characters per token) for a list of chat messages."""
+    total_chars = 0
+    for message in messages or []:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", message)
+        if isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict) and part.get("type") == "text":
+                    total_chars += len(part.get("text") or "")
+        else:
+            total_chars += len(str(content or ""))
+    return total_chars // 4 + 1
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter enforcing both a requests-per-minute and a tokens-per-minute quota.
+
+    Both buckets refill continuously. When a 429 is seen, `on_rate_limited` opens a cooldown
+    window that doubles on every consecutive 429 and decays again after successful calls.
+    """
+
+    def __init__(self, requests_per_minute: float | None = DEFAULT_RPM,
+                 tokens_per_minute: float | None = DEFAULT_TPM, max_backoff: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._backoff = 0.0
+        self._cooldown_until = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int = 0):
+        """Blocks until one request and `tokens` tokens fit in the quota, then consumes them."""
+        if self.tokens_per_minute:
+            # A single request larger than the whole bucket would otherwise wait forever
+            tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._cooldown_until - now
+                if wait <= 0:
+                    request_deficit = 1 - self._requests if self.requests_per_minute else 0
+                    token_deficit = tokens - self._tokens if self.tokens_per_minute else 0
+                    if request_deficit <= 0 and token_deficit <= 0:
+                        if self.requests_per_minute:
+                            self._requests -= 1
+                        if self.tokens_per_minute:
+                            self._tokens -= tokens
+                        return
+                    wait = max(
+                        request_deficit * 60 / self.requests_per_minute if request_deficit > 0 else 0,
+                        token_deficit * 60 / self.tokens_per_minute if token_deficit > 0 else 0,
+                    )
+            time.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int | None):
+        """Corrects the token bucket once the real usage of a request is known."""
+        if not self.tokens_per_minute or actual_tokens is None:
+            return
+        with self._lock:
+            self._tokens -= actual_tokens - estimated_tokens
+
+    def on_rate_limited(self) -> float:
+        """Registers a 429: empties the request bucket and returns the cooldown applied."""
+        with self._lock:
+            self._backoff = min(self.max_backoff, max(2.0, self._backoff * 2))
+            cooldown = self._backoff * random.uniform(1.0, 1.25)
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + cooldown)
+            self._requests = 0.0
+            return cooldown
+
+    def on_success(self):
+        with self._lock:
+            self._backoff = self._backoff / 2 if self._backoff >= 2 else 0.0
+
+
+# Shared by every caller of the same API key and model: manager model, verifier and media tools
+gemini_limiter = RateLimiter()
+# Quotas are per model: the fast tier doesn't take requests from the strong one's quota
+fast_limiter = RateLimiter(FAST_RPM, FAST_TPM)
+
+
+def rate_limited_completion(limiter: RateLimiter | None = None, max_retries: int = 6, **kwargs):
+    """
+    Calls `litellm.completion(**kwargs)` through the rate limiter, retrying 429 responses
+    with adaptive backoff. Any other error is raised immediately.
+    """
+    import litellm
+
+    limiter = limiter or gemini_limiter
+    estimated_tokens = estimate_message_tokens(kwargs.get("messages"))
+    with tracer.span("completion", kind="llm", model=kwargs.get("model"), estimated_tokens=estimated_tokens) as span:
+        for attempt in range(max_retries + 1):
+            limiter.acquire(estimated_tokens)
+            try:
+                response = litellm.completion(**kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == max_retries:
+                    raise
+                cooldown = limiter.on_rate_limited()
+                span.add(rate_limited=1, backoff_s=cooldown)
+                print(f"Rate limited by {kwargs.get('model')}, backing off for {cooldown:.1f}s (attempt {attempt + 1}/{max_retries})")
+                continue
+            limiter.on_success()
+            usage = getattr(response, "usage", None)
+            limiter.record_usage(estimated_tokens, getattr(usage, "total_tokens", None))
+            span.add(input_tokens=getattr(usage, "prompt_tokens", None) or 0,
+                     output_tokens=getattr(usage, "completion_tokens", None) or 0)
+            return response
+
+
+class RateLimitedCompletionClient:
+    """Drop-in `client` for smolagents' LiteLLMModel that routes completions through the limiter."""
+
+    def __init__(self, limiter: RateLimiter | None = None):
+        self.limiter = limiter or gemini_limiter
+
+    def completion(self, **kwargs):
+        return rate_limited_completion(limiter=self.limiter, **kwargs)
+
+
+def run_concurrently(fn, items, max_workers: int = DEFAULT_CONCURRENCY):
+    """
+    Runs `fn(item)` for every item on a bounded thread pool and yields `(item, result)`
+    pairs in completion order. Exceptions raised by `fn` are re-raised to the caller.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(fn, item): item for item in items}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from http_cache import file_digest
+
+DEFAULT_TABLE_CACHE_DIR = os.getenv("TABLE_CACHE_DIR", os.path.join(".cache", "tables"))
+
+
+def _has_pyarrow() -> bool:
+    """Parquet needs pyarrow; without it the parsed sheets are only cached in memory."""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _string_columns(df):
+    """Parquet needs string column names: fresh and cached sheets get the same labels."""
+    return df.set_axis([str(column) for column in df.columns], axis=1)
+
+
+class TableCache:
+    """
+    Cache of parsed spreadsheets. Every sheet of a workbook is parsed once, written to a
+    Parquet file under `<cache_dir>/<content sha256>/` and kept in a small in-memory LRU,
+    so agent steps that look at the same file again never re-parse the xlsx.
+    The content hash is only recomputed when the file's mtime or size changes.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_TABLE_CACHE_DIR, max_workbooks: int = 8):
+        self.cache_dir = cache_dir
+        self.max_workbooks = max_workbooks
+        self._workbooks = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse(file_path: str) -> dict:
+        import pandas as pd
+
+        if file_path.lower().endswith(".csv"):
+            sheets = {"csv": pd.read_csv(file_path)}
+        else:
+            sheets = pd.read_excel(file_path, sheet_name=None)
+        return {str(name): _string_columns(df) for name, df in sheets.items()}
+
+    def _load_from_disk(self, directory: str) -> dict | None:
+        import pandas as pd
+
+        try:
+            with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            sheets = {}
+            if manifest.get("format") != "parquet":
+                return None
+            for index, sheet_name in enumerate(manifest["sheets"]):
+                sheets[sheet_name] = pd.read_parquet(os.path.join(directory, f"{index}.parquet"))
+            return sheets
+        except (OSError, ValueError, KeyError, ImportError):
+            return None
+
+    def _save_to_disk(self, directory: str, sheets: dict):
+        if not _has_pyarrow():
+            return
+        os.makedirs(directory, exist_ok=True)
+        try:
+            for index, df in enumerate(sheets.values()):
+                df.to_parquet(os.path.join(directory, f"{index}.parquet"))
+            # The manifest is written last: a directory without it is ignored and rebuilt
+            with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump({"format": "parquet", "sheets": list(sheets)}, f)
+        except Exception as e:
+            print(f"Error caching parsed workbook: {e}")
+
+    def load(self, file_path: str) -> dict:
+        """Returns {sheet name: DataFrame} for every sheet of the workbook."""
+        digest = file_digest(file_path)
+        with self._lock:
+            sheets = self._workbooks.get(digest)
+            if sheets is not None:
+                self._workbooks.move_to_end(digest)
+                return sheets
+        directory = os.path.join(self.cache_dir, digest)
+        sheets = self._load_from_disk(directory)
+        if sheets is None:
+            sheets = self._parse(file_path)
+            self._save_to_disk(directory, sheets)
+        with self._lock:
+            self._workbooks[digest] = sheets
+            while len(self._workbooks) > self.max_workbooks:
+                self._workbooks.popitem(last=False)
+        return sheets
+
+    def sheet(self, file_path: str, sheet_name: str | None = None):
+        """Returns one sheet, the first one when no name is given."""
+        sheets = self.load(file_path)
+        if not sheet_name:
+            return next(iter(sheets.values()))
+        if sheet_name not in sheets:
+            raise KeyError(f"Sheet '{sheet_name}' not found, available sheets: {list(sheets)}")
+        return sheets[sheet_name]
+
+
+def describe_schema(df, sheet_name: str) -> str:
+    """Compact summary of a sheet: shape, and per column its dtype, null count and an example value."""
+    lines = [f"Sheet '{sheet_name}': {len(df)} rows x {len(df.columns)} columns"]
+    for column in df.columns:
+        series = df[column]
+        non_null = series.dropna()
+        value = non_null.iloc[0] if len(non_null) else None
+        example = repr(value.item() if hasattr(value, "item") else value) if value is not None else "n/a"
+        lines.append(f"  - {column!r} ({series.dtype}), {series.isna().sum()} nulls, e.g. {example}")
+    return "\n".join(lines)
+
+
+table_cache = TableCache()
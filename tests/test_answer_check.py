@@ -0,0 +1,34 @@
+import pytest
+
+from answer_check import normalize_answer, rule_verdict
+
+
+@pytest.mark.parametrize("question, answer, expected", [
+    ("How much did it cost in USD?", "$1,234.50", "1234.50"),
+    ("How many people attended?", "12,000", "12000"),
+    ("Give the ids as a comma separated list.", "100,200,300", "100, 200, 300"),
+    ("List the ingredients.", "flour; sugar ;eggs.", "flour, sugar, eggs"),
+    ("Which band recorded it?", "The Beatles", "The Beatles"),
+    ("What is the answer?", "FINAL ANSWER: 42", "42"),
+])
+def test_normalize_answer(question, answer, expected):
+    assert normalize_answer(answer, question) == expected
+
+
+def test_list_of_numbers_is_not_merged_for_a_list_question():
+    question = "Give the page numbers as a comma separated list."
+    assert rule_verdict(question, normalize_answer("100,200,300", question)) == (True, "list")
+
+
+def test_leading_article_needs_a_judgement():
+    assert rule_verdict("Which band recorded it?", "The Beatles") is None
+    assert rule_verdict("Which band recorded it?", "Beatles") == (True, "short string")
+
+
+@pytest.mark.parametrize("answer", ["5 apples", "12 km", "five"])
+def test_numeric_question_needs_a_bare_number(answer):
+    assert rule_verdict("How many apples are there?", answer) is None
+
+
+def test_numeric_question_with_bare_number():
+    assert rule_verdict("How many apples are there?", "5") == (True, "number")
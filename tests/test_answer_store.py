@@ -0,0 +1,33 @@
+from answer_store import AnswerStore
+
+
+def test_put_after_torn_write_is_kept(tmp_path):
+    path = str(tmp_path / "answers.jsonl")
+    AnswerStore(path).put("a", "question a", "fp", "answer a")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "b:torn')
+
+    store = AnswerStore(path)
+    assert store.get("a", "question a", "fp")["submitted_answer"] == "answer a"
+    store.put("c", "question c", "fp", "answer c")
+
+    reloaded = AnswerStore(path)
+    assert sorted(record["task_id"] for record in reloaded.latest_answers()) == ["a", "c"]
+
+
+def test_submit_cached_answers_uses_the_current_configuration(tmp_path, monkeypatch):
+    import evaluation
+    from agent import BasicAgent
+    from answer_store import config_fingerprint
+
+    path = str(tmp_path / "answers.jsonl")
+    store = AnswerStore(path)
+    store.put("t1", "question 1", config_fingerprint(BasicAgent.config), "current")
+    store.put("t1", "question 1", "old-config", "stale")
+    store.put("t2", "question 2", "old-config", "abandoned")
+    submitted = []
+    monkeypatch.setattr(evaluation, "AnswerStore", lambda: AnswerStore(path))
+    monkeypatch.setattr(evaluation, "submit_answers", lambda username, agent_code, answers, log: submitted.append(answers))
+
+    evaluation.submit_cached_answers("user")
+    assert submitted == [[{"task_id": "t1", "submitted_answer": "current"}]]
@@ -0,0 +1,39 @@
+import hashlib
+import os
+
+from utils import AttachmentStore
+
+
+def test_concurrent_prefetch_is_content_addressed(http_server, tmp_path):
+    shared, other = b"%PDF-1.4 shared attachment", b"col_a,col_b\n1,2\n"
+    http_server.routes = {
+        "/files/t1": (200, {}, shared),
+        "/files/t2": (200, {}, shared),
+        "/files/t3": (200, {}, other),
+    }
+    questions = [
+        {"task_id": "t1", "file_name": "report.pdf"},
+        {"task_id": "t2", "file_name": "copy.PDF"},
+        {"task_id": "t3", "file_name": "table.csv"},
+        {"task_id": "t4", "file_name": "missing.mp3"},
+        {"task_id": "t5", "file_name": ""},
+    ]
+    store_dir = str(tmp_path / "files")
+    futures = AttachmentStore(store_dir, api_url=http_server.url).prefetch(questions)
+    paths = {task_id: future.result() for task_id, future in futures.items()}
+
+    assert set(paths) == {"t1", "t2", "t3", "t4"}
+    assert paths["t1"] == paths["t2"] == os.path.join(store_dir, hashlib.sha256(shared).hexdigest() + ".pdf")
+    assert paths["t3"] == os.path.join(store_dir, hashlib.sha256(other).hexdigest() + ".csv")
+    assert paths["t4"] is None
+    with open(paths["t3"], "rb") as f:
+        assert f.read() == other
+    assert sorted(name for name in os.listdir(store_dir) if not name.endswith(".json")) == sorted(
+        os.path.basename(path) for path in {paths["t1"], paths["t3"]}
+    )
+
+    # A later run finds the files through the index, without downloading them again
+    requests_before = len(http_server.requests)
+    store = AttachmentStore(store_dir, api_url=http_server.url)
+    assert store.fetch({"task_id": "t1", "file_name": "report.pdf"}) == paths["t1"]
+    assert len(http_server.requests) == requests_before
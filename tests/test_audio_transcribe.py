@@ -0,0 +1,96 @@
+import pytest
+
+pydub = pytest.importorskip("pydub")
+from pydub import AudioSegment
+from pydub.generators import Sine
+
+import audio_transcribe
+from audio_transcribe import MAX_CHUNK_MS, segment_on_silence, stitch_transcripts, transcribe_audio
+from media import MediaAnalyzer, MockMediaBackend
+
+
+def tone(ms: int):
+    return Sine(440).to_audio_segment(duration=ms).set_frame_rate(8000)
+
+
+def silence(ms: int):
+    return AudioSegment.silent(duration=ms, frame_rate=8000)
+
+
+def test_chunks_respect_the_cap_and_skip_long_silences():
+    audio = tone(20_000) + silence(100_000) + tone(50_000) + silence(5_000) + tone(15_000)
+    chunks = segment_on_silence(audio)
+    assert all(end - start <= MAX_CHUNK_MS for start, end in chunks)
+    uploaded = sum(end - start for start, end in chunks)
+    # 85s of speech, only the padding of the silences is kept
+    assert uploaded < 90_000
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(audio)
+
+
+def test_long_speech_is_split_with_overlap():
+    chunks = segment_on_silence(tone(150_000))
+    assert all(end - start <= MAX_CHUNK_MS for start, end in chunks)
+    assert all(next_start < end for (_, end), (next_start, _) in zip(chunks, chunks[1:]))
+
+
+def test_stitch_removes_repeated_overlap():
+    assert stitch_transcripts(["the quick brown fox", "brown fox jumps over"]) == "the quick brown fox jumps over"
+
+
+class FlakyBackend(MockMediaBackend):
+    """Mock backend failing on the given call numbers."""
+
+    def __init__(self, failing_calls):
+        super().__init__()
+        self.failing_calls = set(failing_calls)
+
+    def describe(self, data: bytes, mime_type: str, prompt: str) -> str:
+        text = super().describe(data, mime_type, prompt)
+        if self.calls in self.failing_calls:
+            raise RuntimeError("model unavailable")
+        return text
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    """Three 40s chunks with different content, transcribed one after the other."""
+    monkeypatch.setattr(audio_transcribe, "SMALL_AUDIO_BYTES", 0)
+    path = str(tmp_path / "memo.wav")
+    audio = silence(0)
+    for frequency in (440, 660, 880):
+        audio += Sine(frequency).to_audio_segment(duration=40_000).set_frame_rate(8000) + silence(5_000)
+    audio.export(path, format="wav")
+    return path
+
+
+def use_backend(monkeypatch, backend):
+    monkeypatch.setattr(audio_transcribe, "media_analyzer", MediaAnalyzer(backend=backend, cache_dir=None))
+
+
+def test_failed_chunk_is_retried(recording, monkeypatch):
+    backend = FlakyBackend(failing_calls=[2])
+    use_backend(monkeypatch, backend)
+    transcript = transcribe_audio(recording, max_workers=1)
+    assert backend.calls == 4
+    assert transcript.count("[mock]") == 3
+    assert "could not be transcribed" not in transcript
+
+
+def test_failing_chunk_is_marked_and_the_others_are_kept(recording, monkeypatch):
+    backend = FlakyBackend(failing_calls=[2, 3])
+    use_backend(monkeypatch, backend)
+    transcript = transcribe_audio(recording, max_workers=1)
+    # No whole-file request: chunk 1, chunk 2 twice, chunk 3
+    assert backend.calls == 4
+    assert transcript.count("[mock]") == 2
+    marker = transcript.index("could not be transcribed]")
+    assert transcript.index("[mock]") < marker < transcript.rindex("[mock]")
+    # The partial transcript isn't cached: only the failed chunk is sent again
+    assert transcribe_audio(recording, max_workers=1).count("[mock]") == 3
+    assert backend.calls == 5
+
+
+def test_all_chunks_failing_raises(recording, monkeypatch):
+    use_backend(monkeypatch, FlakyBackend(failing_calls=range(1, 10)))
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        transcribe_audio(recording, max_workers=1)
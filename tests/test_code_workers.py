@@ -0,0 +1,58 @@
+import pytest
+from smolagents import ActionStep, ChatMessage, Model, tool
+from smolagents.local_python_executor import InterpreterError
+
+from agent import SandboxedCodeAgent, TracedProcessPythonExecutor
+
+
+@tool
+def double(x: int) -> int:
+    """
+    Doubles a number.
+
+    Args:
+        x: the number to double
+    """
+    return 2 * x
+
+
+class ScriptedModel(Model):
+    """Answers each step with the next code block of the script."""
+
+    def __init__(self, steps: list[str]):
+        super().__init__(model_id="scripted")
+        self.steps = list(steps)
+
+    def generate(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        code = self.steps.pop(0)
+        return ChatMessage(role="assistant", content=f"Thought: next step.\n<code>\n{code}\n</code>")
+
+
+def test_two_step_agent_runs_on_worker():
+    model = ScriptedModel(["x = double(21)\nprint(x)", "final_answer(x + 1)"])
+    agent = SandboxedCodeAgent(tools=[double], model=model, max_steps=4, verbosity_level=0)
+    assert isinstance(agent.python_executor, TracedProcessPythonExecutor)
+    try:
+        assert agent.run("What is double 21 plus one?") == 43
+        steps = [step for step in agent.memory.steps if isinstance(step, ActionStep)]
+        assert len(steps) == 2
+        assert all(step.error is None for step in steps)
+        assert "Execution logs:\n42\n" in steps[0].observations
+    finally:
+        agent.cleanup()
+
+
+def test_reset_clears_worker_state():
+    executor = TracedProcessPythonExecutor(["pandas"])
+    try:
+        executor.send_variables({"question_var": 1})
+        executor.send_tools({})
+        executor("secret = 'question 1'")
+        assert executor("secret").output == "question 1"
+        executor.reset()
+        with pytest.raises(InterpreterError):
+            executor("secret")
+        with pytest.raises(InterpreterError):
+            executor("question_var")
+    finally:
+        executor.cleanup()
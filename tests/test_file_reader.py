@@ -0,0 +1,61 @@
+import pytest
+
+from file_reader import LINE_INDEX_STRIDE, FileReader, FileReaderError
+
+
+@pytest.fixture
+def reader():
+    return FileReader()
+
+
+@pytest.fixture
+def numbered_file(tmp_path):
+    path = tmp_path / "numbers.txt"
+    path.write_text("".join(f"line {number}\n" for number in range(1, 2 * LINE_INDEX_STRIDE + 51)))
+    return str(path)
+
+
+def test_window_across_the_index_stride(reader, numbered_file):
+    window = reader.read_lines(numbered_file, start_line=LINE_INDEX_STRIDE - 2, num_lines=5)
+    lines = window.splitlines()
+    assert lines[0] == f"Lines {LINE_INDEX_STRIDE - 2}-{LINE_INDEX_STRIDE + 2} of {2 * LINE_INDEX_STRIDE + 50} (continue with start_line={LINE_INDEX_STRIDE + 3})"
+    assert [line.split("| ")[1] for line in lines[1:]] == [f"line {number}" for number in range(LINE_INDEX_STRIDE - 2, LINE_INDEX_STRIDE + 3)]
+    # Right after the second indexed offset
+    window = reader.read_lines(numbered_file, start_line=2 * LINE_INDEX_STRIDE + 1, num_lines=1)
+    assert window.splitlines()[1].endswith(f"| line {2 * LINE_INDEX_STRIDE + 1}")
+
+
+def test_last_window_and_line_past_the_end(reader, numbered_file):
+    total = 2 * LINE_INDEX_STRIDE + 50
+    window = reader.read_lines(numbered_file, start_line=total - 1, num_lines=10)
+    assert window.splitlines()[0] == f"Lines {total - 1}-{total} of {total}"
+    with pytest.raises(FileReaderError):
+        reader.read_lines(numbered_file, start_line=total + 1)
+
+
+def test_file_without_trailing_newline(reader, tmp_path):
+    path = tmp_path / "no_newline.txt"
+    path.write_bytes(b"first\r\nsecond\r\nlast")
+    assert reader.line_count(str(path)) == 3
+    window = reader.read_lines(str(path), start_line=2)
+    assert window.splitlines() == ["Lines 2-3 of 3", "     2| second", "     3| last"]
+
+
+def test_byte_offset_reads(reader, tmp_path):
+    path = tmp_path / "minified.json"
+    path.write_bytes(b'{"a":' + b"1" * 100 + b"}")
+    window = reader.read_bytes(str(path), offset=2, length=3)
+    assert window.splitlines() == ["Bytes 2-5 of 106 (continue with offset=5)", 'a":']
+    assert reader.read_bytes(str(path), offset=100).splitlines()[0] == "Bytes 100-106 of 106"
+    with pytest.raises(FileReaderError):
+        reader.read_bytes(str(path), offset=106)
+
+
+def test_empty_file(reader, tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert reader.line_count(str(path)) == 0
+    with pytest.raises(FileReaderError, match="empty"):
+        reader.read_bytes(str(path), offset=0)
+    with pytest.raises(FileReaderError, match="empty"):
+        reader.read_lines(str(path))
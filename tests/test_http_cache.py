@@ -0,0 +1,89 @@
+import threading
+import time
+
+from http_cache import ResponseCache
+from http_client import HttpClient
+
+client = HttpClient(max_retries=0)
+
+
+def fetch(url, headers):
+    return client.get_bounded(url, headers=headers, truncate=True)
+
+
+def test_fresh_entries_are_served_without_requests(http_server, tmp_path):
+    http_server.routes["/page"] = (200, {}, b"<p>hello</p>")
+    cache = ResponseCache(str(tmp_path))
+    url = f"{http_server.url}/page"
+    assert cache.fetch_text(url, fetch) == "<p>hello</p>"
+    assert cache.fetch_text(url, fetch) == "<p>hello</p>"
+    # From disk, in a new process
+    assert ResponseCache(str(tmp_path)).fetch_text(url, fetch) == "<p>hello</p>"
+    assert http_server.count("/page") == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["revalidated"]) == (1, 1, 0)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_expired_entries_are_revalidated_with_etag(http_server, tmp_path):
+    def page(headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"ETag": '"v1"'}, b"version 1"
+
+    http_server.routes["/etag"] = page
+    cache = ResponseCache(str(tmp_path))
+    url = f"{http_server.url}/etag"
+    assert cache.fetch_text(url, fetch, ttl=0) == "version 1"
+    assert cache.fetch_text(url, fetch, ttl=0) == "version 1"
+    assert http_server.requests[-1][1].get("If-None-Match") == '"v1"'
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["revalidated"]) == (0, 1, 1)
+
+
+def test_expired_entries_are_revalidated_with_last_modified(http_server, tmp_path):
+    modified = "Wed, 21 Oct 2015 07:28:00 GMT"
+    versions = iter([b"old", b"new"])
+
+    def page(headers):
+        if headers.get("If-Modified-Since") == modified and http_server.count("/modified") == 2:
+            return 304, {}, b""
+        return 200, {"Last-Modified": modified}, next(versions)
+
+    http_server.routes["/modified"] = page
+    cache = ResponseCache(None)
+    url = f"{http_server.url}/modified"
+    assert cache.fetch_text(url, fetch, ttl=0) == "old"
+    # Not modified: the cached body is kept
+    assert cache.fetch_text(url, fetch, ttl=0) == "old"
+    assert http_server.requests[-1][1].get("If-Modified-Since") == modified
+    # Modified: downloaded again and counted as a miss
+    assert cache.fetch_text(url, fetch, ttl=0) == "new"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["revalidated"]) == (0, 2, 1)
+
+
+def test_concurrent_lookups_compute_once(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    threads = [threading.Thread(target=cache.get_or_compute, args=("search", "query", compute)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 7
+
+
+def test_cache_directory_is_created_on_first_write(tmp_path):
+    cache_dir = tmp_path / "cache" / "web"
+    cache = ResponseCache(str(cache_dir))
+    assert not cache_dir.exists()
+    assert cache.get_or_compute("search", "query", lambda: "results") == "results"
+    assert len(list(cache_dir.glob("*.json"))) == 1
@@ -0,0 +1,59 @@
+import socket
+import threading
+
+import pytest
+import requests
+
+import http_client as http_client_module
+from http_client import HttpClient
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(http_client_module.time, "sleep", delays.append)
+    return delays
+
+
+def test_post_with_error_status_is_sent_once(http_server, sleeps):
+    http_server.routes["/submit"] = (503, {}, b"busy")
+    response = HttpClient(max_retries=3).post(f"{http_server.url}/submit", json={"answers": []})
+    assert response.status_code == 503
+    assert http_server.count("/submit") == 1
+    assert sleeps == []
+
+
+def test_get_with_error_status_is_retried(http_server, sleeps):
+    http_server.routes["/questions"] = (503, {"Retry-After": "1"}, b"busy")
+    response = HttpClient(max_retries=2).get(f"{http_server.url}/questions")
+    assert response.status_code == 503
+    assert http_server.count("/questions") == 3
+    assert sleeps == [1.0, 1.0]
+
+
+def test_post_is_retried_when_the_connection_is_refused(sleeps):
+    with socket.socket() as free:
+        free.bind(("127.0.0.1", 0))
+        port = free.getsockname()[1]
+    with pytest.raises(requests.ConnectionError):
+        HttpClient(max_retries=2).post(f"http://127.0.0.1:{port}/submit", json={})
+    assert len(sleeps) == 2
+
+
+def test_post_is_not_retried_when_the_connection_drops_after_sending(sleeps):
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        port = server.getsockname()[1]
+
+        def reset_after_request():
+            connection, _ = server.accept()
+            connection.recv(65536)
+            connection.close()
+
+        thread = threading.Thread(target=reset_after_request, daemon=True)
+        thread.start()
+        with pytest.raises(requests.ConnectionError):
+            HttpClient(max_retries=2).post(f"http://127.0.0.1:{port}/submit", json={})
+        thread.join(5)
+    assert sleeps == []
@@ -0,0 +1,97 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from media import MediaAnalyzer, MockMediaBackend
+
+
+class FailingBackend(MockMediaBackend):
+    """Fails `failures` times, then answers like the mock backend."""
+
+    def __init__(self, failures: int = 1):
+        super().__init__()
+        self.failures = failures
+
+    def describe(self, data: bytes, mime_type: str, prompt: str) -> str:
+        with self._lock:
+            self.failures -= 1
+            failing = self.failures >= 0
+        if failing:
+            with self._lock:
+                self.calls += 1
+            raise RuntimeError("model unavailable")
+        return super().describe(data, mime_type, prompt)
+
+
+def done(value) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "chart.png"
+    path.write_bytes(b"\x89PNG fake image")
+    return str(path)
+
+
+def test_same_content_is_a_cache_hit(image, tmp_path):
+    backend = MockMediaBackend()
+    analyzer = MediaAnalyzer(backend=backend, cache_dir=None)
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(open(image, "rb").read())
+    first = analyzer.analyze(image)
+    assert analyzer.analyze(str(copy)) == first
+    assert backend.calls == 1
+    # Another prompt is another question about the file
+    analyzer.analyze(image, prompt="How many bars are there?")
+    assert backend.calls == 2
+
+
+def test_concurrent_prewarm_and_analyze_call_the_backend_once(image):
+    backend = MockMediaBackend(delay=0.2)
+    analyzer = MediaAnalyzer(backend=backend, cache_dir=None)
+    thread = analyzer.prewarm([done(image), done(image), done(image)])
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(analyzer.analyze(image))) for _ in range(3)]
+    for caller in callers:
+        caller.start()
+    for caller in callers + [thread]:
+        caller.join(timeout=5)
+    assert backend.calls == 1
+    assert len(set(results)) == 1
+
+
+def test_prewarm_skips_failed_downloads_and_other_files(image, tmp_path):
+    backend = MockMediaBackend()
+    analyzer = MediaAnalyzer(backend=backend, cache_dir=None)
+    failed = Future()
+    failed.set_exception(OSError("download failed"))
+    text = tmp_path / "notes.txt"
+    text.write_text("not a media file")
+    analyzer.prewarm([failed, done(str(text)), done(None), done(image)]).join(timeout=5)
+    assert backend.calls == 1
+
+
+def test_backend_errors_propagate_and_are_not_cached(image):
+    backend = FailingBackend(failures=1)
+    analyzer = MediaAnalyzer(backend=backend, cache_dir=None)
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        analyzer.analyze(image)
+    assert analyzer.analyze(image).startswith("[mock]")
+    assert backend.calls == 2
+
+
+def test_prewarm_errors_do_not_stop_the_other_files(image, tmp_path):
+    backend = FailingBackend(failures=1)
+    analyzer = MediaAnalyzer(backend=backend, cache_dir=None, max_workers=1)
+    other = tmp_path / "photo.jpg"
+    other.write_bytes(b"fake jpeg")
+    analyzer.prewarm([done(image), done(str(other))]).join(timeout=5)
+    assert backend.calls == 2
+    # The file whose analysis failed is analyzed again on request, the other one is cached
+    analyzer.analyze(image)
+    analyzer.analyze(str(other))
+    assert backend.calls == 3
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from safe_eval import MAX_FORMATTED_ITEMS, CalculatorError, evaluate, format_result
+
+
+def calculate(expression: str) -> str:
+    return format_result(evaluate(expression))
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("1,234 * 2", "2468"),
+    ("2,000 + 3", "2003"),
+    ("2,500,000/2", "1250000"),
+    ("$1,299.99 * 3", "3899.97"),
+    ("$5 * 3", "15"),
+    ("15% * 200", "30"),
+    ("10 % 3", "1"),
+    ("3 x 4", "12"),
+    ("0.1 + 0.2", "0.3"),
+    ("2^10", "1024"),
+    ("max(1,2)", "2"),
+    ("sum([1, 2, 3])", "6"),
+])
+def test_calculator_expressions(expression, expected):
+    assert calculate(expression) == expected
+
+
+def test_bare_tuple_is_rejected():
+    with pytest.raises(CalculatorError):
+        evaluate("1,2")
+
+
+def test_integer_ranges_do_not_overflow():
+    assert calculate("prod(range(1,30))") == "8841761993739701954543616000000"
+    assert calculate("sum(range(1,10**6)**3)") == str(sum(i ** 3 for i in range(1, 10 ** 6)))
+    assert calculate("max(range(1,4)**40)") == str(3 ** 40)
+    with pytest.raises(CalculatorError):
+        evaluate("prod(range(1,10**6))")
+    with pytest.raises(CalculatorError):
+        evaluate("range(1,4)**700")
+
+
+def test_long_vectors_are_formatted_with_their_length():
+    start = time.monotonic()
+    result = calculate("range(10**6)*range(10**6)")
+    assert time.monotonic() - start < 1
+    assert result.endswith("... (1000000 values)]")
+    assert result.count(",") == MAX_FORMATTED_ITEMS
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("mean(range(10)) + 1", "5.5"),
+    ("median([1, 2, 3]) * 2", "4"),
+    ("std(range(10)) ^ 2", "8.25"),
+    ("sum(range(10) / 4) + 1", "12.25"),
+    ("max(range(5)) + 1", "5"),
+    ("mean(range(10)) + range(3)", "[4.5, 5.5, 6.5]"),
+])
+def test_aggregate_then_operation(expression, expected):
+    assert calculate(expression) == expected
+
+
+def test_results_of_about_3000_digits_are_allowed():
+    assert calculate("10**3000") == "1" + "0" * 3000
+    with pytest.raises(CalculatorError):
+        evaluate("10**3100")
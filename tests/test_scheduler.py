@@ -0,0 +1,127 @@
+import sys
+import types
+
+import pytest
+
+import scheduler
+from scheduler import RateLimiter, rate_limited_completion
+
+
+class FakeClock:
+    """Stands in for the time module in scheduler: sleeping advances the clock instantly."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler, "time", clock)
+    # No jitter on the cooldowns
+    monkeypatch.setattr(scheduler.random, "uniform", lambda low, high: low)
+    return clock
+
+
+def test_requests_over_the_rpm_wait(clock):
+    limiter = RateLimiter(requests_per_minute=3, tokens_per_minute=None)
+    for _ in range(3):
+        limiter.acquire()
+    assert clock.sleeps == []
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(20.0)]
+
+
+def test_buckets_refill_over_time(clock):
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=None)
+    limiter.acquire()
+    limiter.acquire()
+    clock.now += 30
+    limiter.acquire()
+    assert clock.sleeps == []
+
+
+def test_tokens_over_the_tpm_wait(clock):
+    limiter = RateLimiter(requests_per_minute=None, tokens_per_minute=600)
+    limiter.acquire(600)
+    limiter.acquire(300)
+    assert clock.sleeps == [pytest.approx(30.0)]
+
+
+def test_request_larger_than_the_bucket_is_clamped(clock):
+    limiter = RateLimiter(requests_per_minute=None, tokens_per_minute=600)
+    limiter.acquire(10_000)
+    assert clock.sleeps == []
+    limiter.acquire(10_000)
+    assert sum(clock.sleeps) == pytest.approx(60.0)
+
+
+def test_record_usage_corrects_the_estimate(clock):
+    limiter = RateLimiter(requests_per_minute=None, tokens_per_minute=600)
+    limiter.acquire(100)
+    limiter.record_usage(estimated_tokens=100, actual_tokens=400)
+    limiter.acquire(300)
+    assert clock.sleeps == [pytest.approx(10.0)]
+
+
+def test_cooldown_doubles_up_to_max_backoff_and_decays(clock):
+    limiter = RateLimiter(requests_per_minute=None, tokens_per_minute=None, max_backoff=10.0)
+    assert [limiter.on_rate_limited() for _ in range(4)] == [2.0, 4.0, 8.0, 10.0]
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.on_rate_limited() == 5.0
+    # acquire waits for the end of the cooldown
+    limiter.acquire()
+    assert sum(clock.sleeps) == pytest.approx(10.0)
+
+
+def fake_litellm(monkeypatch, outcomes):
+    calls = []
+
+    def completion(**kwargs):
+        calls.append(kwargs)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setitem(sys.modules, "litellm", types.SimpleNamespace(completion=completion))
+    return calls
+
+
+def test_completion_retries_rate_limits(clock, monkeypatch):
+    response = types.SimpleNamespace(usage=types.SimpleNamespace(total_tokens=10, prompt_tokens=8, completion_tokens=2))
+    calls = fake_litellm(monkeypatch, [Exception("429 Too Many Requests"), response])
+    limiter = RateLimiter(requests_per_minute=None, tokens_per_minute=None)
+    assert rate_limited_completion(limiter=limiter, model="m", messages=[{"role": "user", "content": "hi"}]) is response
+    assert len(calls) == 2
+    assert clock.sleeps == [pytest.approx(2.0)]
+
+
+def test_completion_raises_other_errors_at_once(clock, monkeypatch):
+    calls = fake_litellm(monkeypatch, [ValueError("invalid request")])
+    limiter = RateLimiter(requests_per_minute=None, tokens_per_minute=None)
+    with pytest.raises(ValueError):
+        rate_limited_completion(limiter=limiter, model="m", messages=[{"role": "user", "content": "hi"}])
+    assert len(calls) == 1
+    assert clock.sleeps == []
+
+
+def test_tiers_have_their_own_quota():
+    from agent import BasicAgent
+
+    agent = BasicAgent()
+    try:
+        assert agent.models["fast"].client.limiter is scheduler.fast_limiter
+        assert agent.models["strong"].client.limiter is scheduler.gemini_limiter
+        assert scheduler.fast_limiter.requests_per_minute == scheduler.FAST_RPM
+    finally:
+        agent.manager_agent.cleanup()
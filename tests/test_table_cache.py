@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+import table_cache
+from table_cache import TableCache
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = str(tmp_path / "numbers.xlsx")
+    pd.DataFrame({2020: [1, 2], "name": ["a", "b"]}).to_excel(path, sheet_name="data", index=False)
+    return path
+
+
+def test_fresh_and_cached_sheets_have_the_same_labels(workbook, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    fresh = TableCache(cache_dir).sheet(workbook)
+    assert list(fresh.columns) == ["2020", "name"]
+    cached = TableCache(cache_dir).sheet(workbook)
+    assert list(cached.columns) == list(fresh.columns)
+    pd.testing.assert_frame_equal(fresh, cached)
+
+
+def test_workbook_round_trips_through_parquet(workbook, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    cache_dir = str(tmp_path / "cache")
+    to_parquet = pd.DataFrame.to_parquet
+
+    def checked_to_parquet(df, path, *args, **kwargs):
+        # The manifest is written last: it must not exist while the sheets are written
+        assert not os.path.exists(os.path.join(os.path.dirname(path), "manifest.json"))
+        return to_parquet(df, path, *args, **kwargs)
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", checked_to_parquet)
+    cache = TableCache(cache_dir)
+    sheets = cache.load(workbook)
+    (directory,) = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)]
+    assert sorted(os.listdir(directory)) == ["0.parquet", "manifest.json"]
+
+    loaded = cache._load_from_disk(directory)
+    assert list(loaded) == ["data"]
+    pd.testing.assert_frame_equal(loaded["data"], sheets["data"])
+
+    os.remove(os.path.join(directory, "manifest.json"))
+    assert cache._load_from_disk(directory) is None
+
+
+def test_nothing_is_written_without_pyarrow(workbook, tmp_path, monkeypatch):
+    monkeypatch.setattr(table_cache, "_has_pyarrow", lambda: False)
+    cache_dir = str(tmp_path / "cache")
+    sheets = TableCache(cache_dir).load(workbook)
+    assert list(sheets) == ["data"]
+    assert not os.path.exists(cache_dir)
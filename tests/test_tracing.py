@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+
+from tracing import Tracer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def default_trace_path(**env) -> str:
+    environ = {name: value for name, value in os.environ.items() if name != "TRACE_PATH"}
+    environ.update(env)
+    return subprocess.run(
+        [sys.executable, "-c", "from tracing import tracer; print(tracer.path)"],
+        cwd=ROOT, env=environ, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+
+
+def test_no_trace_file_unless_trace_path_is_set(tmp_path):
+    assert default_trace_path() == "None"
+    assert default_trace_path(TRACE_PATH="") == "None"
+    assert default_trace_path(TRACE_PATH=str(tmp_path / "traces.jsonl")) == str(tmp_path / "traces.jsonl")
+
+
+def test_spans_are_written_to_the_trace_path(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(str(path))
+    with tracer.trace("task-1"):
+        with tracer.span("search", kind="tool"):
+            pass
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["search", "question"]
+    assert {span["trace_id"] for span in spans} == {"task-1"}
@@ -0,0 +1,191 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+# Spans are only kept in memory unless a JSONL file is given
+DEFAULT_TRACE_PATH = os.getenv("TRACE_PATH") or None
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation. Numeric attributes added with `add` are summed, others overwritten."""
+
+    def __init__(self, name: str, kind: str, trace_id: str | None, parent_id: str | None, attributes: dict):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self.end = None
+        self.status = "ok"
+
+    def add(self, **attributes):
+        for key, value in attributes.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and isinstance(self.attributes.get(key), (int, float)):
+                self.attributes[key] += value
+            else:
+                self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def to_dict(self) -> dict:
+        # Field names follow the OpenTelemetry span data model so the file can be converted as is
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": int(self.start * 1e9),
+            "end_time_unix_nano": int((self.end or time.time()) * 1e9),
+            "duration_s": round(self.duration, 4),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    """
+    Collects spans for tool calls, LLM completions and agent steps, grouped by trace (one trace
+    per question), writes them as JSONL and produces a one-line summary per trace.
+    """
+
+    def __init__(self, path: str | None = DEFAULT_TRACE_PATH, max_traces: int = 1024):
+        self.path = path
+        self.max_traces = max_traces
+        self._spans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _finish(self, span: Span):
+        span.end = span.end or time.time()
+        with self._lock:
+            # Only the most recent traces are kept in memory for summaries, the file has them all
+            if span.trace_id is not None:
+                self._spans.setdefault(span.trace_id, []).append(span)
+                while len(self._spans) > self.max_traces:
+                    self._spans.popitem(last=False)
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(span.to_dict(), default=str) + "\n")
+                except OSError as e:
+                    print(f"Error writing trace span: {e}")
+
+    @contextmanager
+    def trace(self, trace_id: str | None = None, **attributes):
+        """Root span of a question: every span opened in this context belongs to the same trace."""
+        trace_token = _current_trace.set(trace_id or uuid.uuid4().hex)
+        try:
+            with self.span("question", kind="question", **attributes) as root:
+                yield root
+        finally:
+            _current_trace.reset(trace_token)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes):
+        parent = _current_span.get()
+        span = Span(name, kind, _current_trace.get(), parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes["error"] = str(e)[:200]
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def current_span(self) -> Span | None:
+        return _current_span.get()
+
+    @contextmanager
+    def attach(self, span: Span | None):
+        """Makes `span` the parent of the spans opened in this context, e.g. on another thread."""
+        if span is None:
+            yield
+            return
+        trace_token = _current_trace.set(span.trace_id)
+        span_token = _current_span.set(span)
+        try:
+            yield
+        finally:
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+
+    def record(self, name: str, kind: str, start: float, end: float, **attributes):
+        """Adds an already finished span (e.g. an agent step reported by a callback)."""
+        parent = _current_span.get()
+        span = Span(name, kind, _current_trace.get(), parent.span_id if parent else None, attributes)
+        span.start, span.end = start, end
+        self._finish(span)
+
+    def annotate(self, **attributes):
+        """Adds attributes (token counts, bytes, cache hits...) to the innermost open span."""
+        span = _current_span.get()
+        if span is not None:
+            span.add(**attributes)
+
+    def spans(self, trace_id: str) -> list[Span]:
+        with self._lock:
+            return list(self._spans.get(trace_id, []))
+
+    def summarize(self, trace_id: str) -> str:
+        """e.g. `41.2s strong (escalated) | llm 9x 30.1s 52.3k>3.1k tok | tools 6x 7.9s, 2 cached, 1.2MB | verifier 1x 2.0s | step 7x 40.8s`"""
+        spans = self.spans(trace_id)
+        if not spans:
+            return ""
+        by_kind = defaultdict(list)
+        for span in spans:
+            by_kind[span.kind].append(span)
+        total = sum(span.duration for span in by_kind["question"]) or max(span.end for span in spans) - min(span.start for span in spans)
+        parts = [f"{total:.1f}s"]
+        tier = by_kind["question"][0].attributes.get("tier") if by_kind["question"] else None
+        if tier:
+            parts[0] += f" {tier}" + (" (escalated)" if by_kind["question"][0].attributes.get("escalated") else "")
+        llm = by_kind["llm"]
+        if llm:
+            tokens_in = sum(span.attributes.get("input_tokens", 0) for span in llm)
+            tokens_out = sum(span.attributes.get("output_tokens", 0) for span in llm)
+            parts.append(f"llm {len(llm)}x {sum(span.duration for span in llm):.1f}s {tokens_in / 1000:.1f}k>{tokens_out / 1000:.1f}k tok")
+        tools = by_kind["tool"]
+        if tools:
+            cached = sum(1 for span in tools if span.attributes.get("cache_hits") and not span.attributes.get("cache_misses"))
+            fetched = sum(span.attributes.get("bytes", 0) for span in tools)
+            parts.append(f"tools {len(tools)}x {sum(span.duration for span in tools):.1f}s, {cached} cached, {fetched / 1e6:.1f}MB")
+        for kind in ("code", "verifier", "step"):
+            if by_kind[kind]:
+                parts.append(f"{kind} {len(by_kind[kind])}x {sum(span.duration for span in by_kind[kind]):.1f}s")
+        return " | ".join(parts)
+
+
+tracer = Tracer()
+
+
+def step_callback(memory_step, agent=None):
+    """smolagents step callback recording every agent step (planning or action) as a span."""
+    timing = getattr(memory_step, "timing", None)
+    if timing is None or timing.start_time is None:
+        return
+    token_usage = getattr(memory_step, "token_usage", None)
+    tracer.record(
+        f"{getattr(agent, 'name', None) or 'manager'}.{type(memory_step).__name__}",
+        "step",
+        timing.start_time,
+        timing.end_time or time.time(),
+        step_number=getattr(memory_step, "step_number", None),
+        input_tokens=token_usage.input_tokens if token_usage else None,
+        output_tokens=token_usage.output_tokens if token_usage else None,
+        error=str(memory_step.error)[:200] if getattr(memory_step, "error", None) else None,
+    )
@@ -1,40 +1,89 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from http_client import http_client
+
+DEFAULT_API_URL = os.getenv("SCORING_API_URL", "https://agents-course-unit4-scoring.hf.space")
+DEFAULT_FILE_STORE_DIR = os.getenv("FILE_STORE_DIR", os.path.join(".cache", "files"))
+
+
+class AttachmentStore:
+    """
+    Content-addressed local store for task attachments.
+
+    Files are saved as `<sha256><extension>` (the extension is kept so tools can tell the file
+    type), so identical attachments are stored once. `index.json` maps each task_id to its file,
+    which lets later runs skip attachments that are already on disk.
+    """
+
+    def __init__(self, store_dir: str = DEFAULT_FILE_STORE_DIR, api_url: str = DEFAULT_API_URL):
+        self.store_dir = store_dir
+        self.api_url = api_url
+        self.index_path = os.path.join(store_dir, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(store_dir, exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def get(self, task_id: str) -> str | None:
+        with self._lock:
+            path = self._index.get(task_id)
+        if path and os.path.exists(path):
+            return path
+        return None
+
+    def fetch(self, record: dict) -> str | None:
+        """Returns the local path of the record's attachment, downloading it if needed."""
+        task_id = record["task_id"]
+        file_name = record.get("file_name")
+        if not file_name:
+            return None
+        path = self.get(task_id)
+        if path:
+            return path
+
+        url = f"{self.api_url}/files/{task_id}"
+        extension = os.path.splitext(file_name)[1].lower()
+        hasher = hashlib.sha256()
+        download_path = os.path.join(self.store_dir, f"{task_id}.download")
+        try:
+            size = http_client.download(url, download_path, hasher=hasher)
+        except requests.RequestException as e:
+            print(f"Failed to download {file_name} for task {task_id}: {e}")
+            return None
+        path = os.path.join(self.store_dir, f"{hasher.hexdigest()}{extension}")
+        os.replace(download_path, path)
+        with self._lock:
+            self._index[task_id] = path
+            self._save_index()
+        print(f"Downloaded {file_name} ({size} bytes) for task {task_id} to {path}")
+        return path
+
+    def prefetch(self, questions_data: list, max_workers: int = 8) -> dict:
+        """
+        Starts downloading every attachment in the background and returns task_id -> Future
+        of the local path, so agents can start while the other files are still downloading.
+        """
+        records = [item for item in questions_data if item.get("task_id") and item.get("file_name")]
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(records) or 1)))
+        futures = {item["task_id"]: executor.submit(self.fetch, item) for item in records}
+        executor.shutdown(wait=False)
+        return futures
+
 
-def download_file(record):
-    DEFAULT_API_URL = "https://agents-course-unit4-scoring.hf.space"
-
-    task_id = record['task_id']
-    url = DEFAULT_API_URL+f'/files/{task_id}'
-
-    filename = record['file_name']
-
-    if filename.endswith('.mp3'):
-        # Local path where the audio will be saved        
-        # Send a GET request to fetch the audio file
-        response = requests.get(url, stream=True)
-        
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Open a local file in binary write mode
-            with open(filename, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=1024):
-                    if chunk:  # filter out keep-alive new chunks
-                        f.write(chunk)
-            print(f"Audio file downloaded successfully and saved as {filename}")
-        else:
-            print(f"Failed to download audio file. Status code: {response.status_code}")
-
-    elif filename.endswith('.png') or filename.endswith('.py') or filename.endswith('.xlsx'):
-        # Send a GET request to fetch the image file
-        response = requests.get(url, stream=True)
-        
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Open a local file in binary write mode
-            with open(filename, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=1024):
-                    if chunk:  # filter out keep-alive new chunks
-                        f.write(chunk)
-            print(f"Image file downloaded successfully and saved as {filename}")
-        else:
-            print(f"Failed to download image file. Status code: {response.status_code}")
\ No newline at end of file
+def download_file(record, store: AttachmentStore | None = None) -> str | None:
+    """Downloads the attachment of a question record (any file type) and returns its local path."""
+    return (store or AttachmentStore()).fetch(record)